@@ -753,7 +753,7 @@ def parse_theme_colors(theme_name):
 
     # Extract DARK_THEME_STYLES port type colors
     port_colors = {}
-    dt_match = re.search(r'DARK_THEME_STYLES\s*=\s*["\']([^"\']+)["\']',
+    dt_match = re.search(r'DARK_THEME_STYLES\s*=\s*b?["\']([^"\']+)["\']',
                          content, re.DOTALL)
     if dt_match:
         css = dt_match.group(1)
@@ -1467,6 +1467,7 @@ def interactive_menu(grc_dir, grc_conf):
                 ("block_entrance_anim", "Block Fade-In"),
                 ("click_ripple",      "Click Ripple"),
                 ("toolbar_css",       "Toolbar Theme"),
+                ("selection_css",     "Selection Colors"),
             ]
 
             fx_config = self._load_effects_config()
@@ -2015,6 +2016,7 @@ def interactive_menu(grc_dir, grc_conf):
                 "connection_gradient": True, "block_entrance_anim": True,
                 "ambient_particles": "off", "click_sound": "off",
                 "click_ripple": True, "toolbar_css": True,
+                "selection_css": True,
             }
             if EFFECTS_PATH.is_file():
                 try:
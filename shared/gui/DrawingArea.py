@@ -8,7 +8,7 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 
 import cairo
-import time
+import sys
 from pathlib import Path
 
 from gi.repository import Gtk, Gdk, GLib
@@ -27,6 +27,11 @@ try:
 except ImportError:
     sounds = None
 
+try:
+    from PIL import Image as _PILImage
+except ImportError:
+    _PILImage = None
+
 try:
     from .canvas.colors import AMBIENT_PARTICLE_TYPE, AMBIENT_PARTICLE_COLOR
 except ImportError:
@@ -39,9 +44,16 @@ _BG_IMAGE_PATH = _GNURADIO_DIR / "grc_background.png"
 _BG_COLOR_PATH = _GNURADIO_DIR / "grc_background_color"
 
 _bg_surface = None
+_bg_data = None  # pixel buffer backing _bg_surface when decoded by Pillow
 _bg_checked = False
 _bg_color = None
 _bg_color_checked = False
+_bg_plan = None
+
+# Background draw plans — which canvas layers actually reach the screen
+PLAN_COLOR_ONLY = 0   # one opaque fill: user color override or theme color
+PLAN_IMAGE_ONLY = 1   # opaque image fully hides the theme color
+PLAN_LAYERED = 2      # translucent image blended over the theme color
 
 
 def _load_bg_color():
@@ -65,27 +77,87 @@ def _load_bg_color():
     return _bg_color
 
 
+def _decode_png(path):
+    """
+    Decode a PNG into an ARGB32 surface.
+    Pillow decodes faster than cairo's libpng path; it is optional, and its
+    premultiplied 'BGRa' packing only matches cairo on little-endian hosts.
+
+    Returns:
+        (surface, buffer) where buffer must outlive the surface;
+        buffer is None when cairo decoded the file itself
+    """
+    if _PILImage is None or sys.byteorder != 'little':
+        return cairo.ImageSurface.create_from_png(str(path)), None
+    with _PILImage.open(str(path)) as img:
+        rgba = img.convert('RGBA')
+    width, height = rgba.size
+    data = bytearray(rgba.tobytes('raw', 'BGRa'))
+    stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width)
+    surface = cairo.ImageSurface.create_for_data(
+        data, cairo.FORMAT_ARGB32, width, height, stride)
+    return surface, data
+
+
 def _load_bg_surface():
     """Load the background image once. Returns cairo.ImageSurface or None."""
-    global _bg_surface, _bg_checked
+    global _bg_surface, _bg_data, _bg_checked
     if _bg_checked:
         return _bg_surface
     _bg_checked = True
     if _BG_IMAGE_PATH.is_file():
         try:
-            _bg_surface = cairo.ImageSurface.create_from_png(str(_BG_IMAGE_PATH))
+            _bg_surface, _bg_data = _decode_png(_BG_IMAGE_PATH)
         except Exception:
-            _bg_surface = None
+            _bg_surface = _bg_data = None
     return _bg_surface
 
 
+def _surface_is_opaque(surface):
+    """True if every pixel of an image surface has full alpha."""
+    fmt = surface.get_format()
+    if fmt == cairo.FORMAT_RGB24:
+        return True
+    if fmt != cairo.FORMAT_ARGB32:
+        return False
+    surface.flush()
+    # ARGB32 is native-endian: alpha is the last byte of each pixel on LE
+    alpha_offset = 3 if sys.byteorder == 'little' else 0
+    alpha = memoryview(surface.get_data())[alpha_offset::4].tobytes()
+    return not alpha.strip(b'\xff')
+
+
+def _load_bg_plan():
+    """Decide once which background layers need painting.
+    Returns (plan, fill_color, surface)."""
+    global _bg_plan
+    if _bg_plan is not None:
+        return _bg_plan
+    bg_color = _load_bg_color()
+    bg = _load_bg_surface()
+    if bg is not None and (bg.get_width() <= 0 or bg.get_height() <= 0):
+        bg = None
+    if bg_color is not None:
+        # The override is always opaque and painted on top of layers 1 and 2
+        _bg_plan = (PLAN_COLOR_ONLY, bg_color, None)
+    elif bg is None:
+        _bg_plan = (PLAN_COLOR_ONLY, FLOWGRAPH_BACKGROUND_COLOR, None)
+    elif _surface_is_opaque(bg):
+        _bg_plan = (PLAN_IMAGE_ONLY, None, bg)
+    else:
+        _bg_plan = (PLAN_LAYERED, FLOWGRAPH_BACKGROUND_COLOR, bg)
+    return _bg_plan
+
+
 def reload_bg():
     """Force reload of background image and color (call after changing files)."""
-    global _bg_surface, _bg_checked, _bg_color, _bg_color_checked
+    global _bg_surface, _bg_data, _bg_checked, _bg_color, _bg_color_checked, _bg_plan
     _bg_surface = None
+    _bg_data = None
     _bg_checked = False
     _bg_color = None
     _bg_color_checked = False
+    _bg_plan = None
 
 
 def _fx_on(name):
@@ -118,12 +190,20 @@ class DrawingArea(Gtk.DrawingArea):
 
         self.zoom_factor = 1.0
         self._update_after_zoom = False
+        self._extents_size = None  # cached flow graph (w, h), None = stale
         self.ctrl_mask = False
         self.mod1_mask = False
-        self.button_state = [False] * 10
+        self.button_state = 0  # bitmask, bit n set while button n is held
 
-        # Animation timer for continuous effects
+        # Animation timers for continuous effects and click ripples
         self._anim_timer_id = None
+        self._ripple_timer_id = None
+
+        # Background layer painters, rebuilt when the background plan changes
+        self._draw_layers = ()
+        self._draw_layers_plan = None
+        self._bg_scaled = None
+        self._bg_scaled_key = None
 
         # self.set_size_request(MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT)
         self.connect('realize', self._handle_window_realize)
@@ -180,6 +260,15 @@ class DrawingArea(Gtk.DrawingArea):
             return
 
         def _anim_tick():
+            if not self.get_mapped():
+                return True  # hidden page: skip simulation and redraw
+            if _fx_on('ambient_particles'):
+                # Physics runs here; draw() only renders the latest state
+                effects._ambient_particles.step(
+                    self.get_allocated_width(), self.get_allocated_height(),
+                    effects.get_ambient_mode())
+            if _fx_on('data_flow_particles'):
+                effects._data_flow_particles.tick()
             self.queue_draw()
             return True  # keep running
 
@@ -191,6 +280,7 @@ class DrawingArea(Gtk.DrawingArea):
         """
         coords = x / self.zoom_factor, y / self.zoom_factor
         self._flow_graph.add_new_block(selection_data.get_text(), coords)
+        self._extents_size = None
 
     def zoom_in(self):
         change = 1.2
@@ -224,32 +314,36 @@ class DrawingArea(Gtk.DrawingArea):
         """Start a short animation timer for click ripple effects."""
         if not _fx_on('click_ripple'):
             return
-        if getattr(self, '_ripple_timer_id', None):
+        if self._ripple_timer_id is not None:
             return  # already running
-        self._ripple_end = time.time() + 1.2  # ripple lasts ~1.2s
 
         def _tick():
             self.queue_draw()
-            if time.time() > self._ripple_end:
-                self._ripple_timer_id = None
-                return False  # stop timer
-            return True  # keep going
+            return True  # keep going until _stop removes us
+
+        def _stop():
+            GLib.source_remove(self._ripple_timer_id)
+            self._ripple_timer_id = None
+            return False  # one-shot
 
         self._ripple_timer_id = GLib.timeout_add(33, _tick)  # ~30 fps
+        GLib.timeout_add(1200, _stop)  # ripple lasts ~1.2s
 
     def _handle_mouse_button_press(self, widget, event):
         """
         Forward button click information to the flow graph.
         """
         self.grab_focus()
+        self._extents_size = None  # a drag may start here
 
         self.ctrl_mask = event.get_state() & Gdk.ModifierType.CONTROL_MASK
         self.mod1_mask = event.get_state() & Gdk.ModifierType.MOD1_MASK
-        self.button_state[event.button] = True
+        self.button_state |= 1 << event.button
 
         if event.button == 1:
             double_click = (event.type == Gdk.EventType._2BUTTON_PRESS)
-            self.button_state[1] = not double_click
+            if double_click:
+                self.button_state &= ~2
             old_selected = set(self._flow_graph.selected_elements)
             self._flow_graph.handle_mouse_selector_press(
                 double_click=double_click,
@@ -270,7 +364,7 @@ class DrawingArea(Gtk.DrawingArea):
         """
         self.ctrl_mask = event.get_state() & Gdk.ModifierType.CONTROL_MASK
         self.mod1_mask = event.get_state() & Gdk.ModifierType.MOD1_MASK
-        self.button_state[event.button] = False
+        self.button_state &= ~(1 << event.button)
         if event.button == 1:
             self._flow_graph.handle_mouse_selector_release(
                 coordinate=self._translate_event_coords(event),
@@ -283,7 +377,7 @@ class DrawingArea(Gtk.DrawingArea):
         self.ctrl_mask = event.get_state() & Gdk.ModifierType.CONTROL_MASK
         self.mod1_mask = event.get_state() & Gdk.ModifierType.MOD1_MASK
 
-        if self.button_state[1]:
+        if self.button_state & 2:  # button 1 held
             self._auto_scroll(event)
 
         self._flow_graph.handle_mouse_motion(
@@ -291,7 +385,9 @@ class DrawingArea(Gtk.DrawingArea):
         )
 
     def _update_size(self):
-        w, h = self._flow_graph.get_extents()[2:]
+        if self._extents_size is None:
+            self._extents_size = self._flow_graph.get_extents()[2:]
+        w, h = self._extents_size
         self.set_size_request(
             w * self.zoom_factor + 100,
             h * self.zoom_factor + 100,
@@ -308,11 +404,20 @@ class DrawingArea(Gtk.DrawingArea):
             adj_val = adj.get_value()
             adj_len = adj.get_page_size()
             if pos - adj_val > adj_len - Constants.SCROLL_PROXIMITY_SENSITIVITY:
-                adj.set_value(adj_val + Constants.SCROLL_DISTANCE)
-                adj.emit('changed')
+                new_val = adj_val + Constants.SCROLL_DISTANCE
             elif pos - adj_val < Constants.SCROLL_PROXIMITY_SENSITIVITY:
-                adj.set_value(adj_val - Constants.SCROLL_DISTANCE)
-                adj.emit('changed')
+                new_val = adj_val - Constants.SCROLL_DISTANCE
+            else:
+                return
+            # Dragging into the border may push elements past the canvas
+            # edge, so re-measure on the next motion event
+            self._extents_size = None
+            # set_value() emits value-changed itself; skip it when already
+            # pinned at either end of the range
+            new_val = max(adj.get_lower(),
+                          min(new_val, adj.get_upper() - adj_len))
+            if new_val != adj_val:
+                adj.set_value(new_val)
 
         scroll(x, scrollbox.get_hadjustment())
         scroll(y, scrollbox.get_vadjustment())
@@ -323,6 +428,7 @@ class DrawingArea(Gtk.DrawingArea):
         Update the flowgraph, which calls new pixmap.
         """
         self._flow_graph.update()
+        self._extents_size = None
         self._update_size()
 
     def _draw_grid_overlay(self, cr, width, height):
@@ -347,62 +453,113 @@ class DrawingArea(Gtk.DrawingArea):
 
     def _draw_ambient_particles(self, cr, width, height):
         """Draw ambient particles on the canvas background."""
-        if effects is None:
-            return
-        mode = effects.get_ambient_mode()
-        if mode == 'off':
-            return
         # Mode is the particle type directly (matrix_rain, bubbles, fire, etc.)
-        ptype = mode
+        ptype = effects.get_ambient_mode()
         pcolor = AMBIENT_PARTICLE_COLOR if AMBIENT_PARTICLE_COLOR else '#66CCFF'
-        effects._ambient_particles.tick_and_draw(cr, width, height, ptype, pcolor)
+        effects._ambient_particles.draw(cr, width, height, ptype, pcolor)
 
-    def draw(self, widget, cr):
-        width = widget.get_allocated_width()
-        height = widget.get_allocated_height()
+    def _get_scaled_bg(self, bg, width, height):
+        """
+        Resample the background image to the canvas pixel size, but never
+        above the image's own resolution, so each frame reads at most one
+        source pixel per device pixel. Cached until the image, the canvas
+        size or the scale factor changes.
+        """
+        scale = self.get_scale_factor()
+        key = (bg, width, height, scale)
+        if self._bg_scaled_key != key:
+            bg_w, bg_h = bg.get_width(), bg.get_height()
+            target_w = max(1, min(bg_w, int(width * scale)))
+            target_h = max(1, min(bg_h, int(height * scale)))
+            if (target_w, target_h) == (bg_w, bg_h):
+                scaled = bg
+            else:
+                scaled = cairo.ImageSurface(cairo.FORMAT_ARGB32, target_w, target_h)
+                scr = cairo.Context(scaled)
+                scr.scale(target_w / bg_w, target_h / bg_h)
+                scr.set_source_surface(bg, 0, 0)
+                scr.get_source().set_extend(cairo.EXTEND_PAD)
+                scr.get_source().set_filter(cairo.FILTER_BILINEAR)
+                scr.paint()
+            self._bg_scaled = scaled
+            self._bg_scaled_key = key
+        return self._bg_scaled
+
+    def _paint_bg_image(self, cr, bg, width, height):
+        """Stretch the user background image over the full canvas."""
+        scaled = self._get_scaled_bg(bg, width, height)
+        cr.save()
+        cr.scale(width / scaled.get_width(), height / scaled.get_height())
+        cr.set_source_surface(scaled, 0, 0)
+        # Pad edges so nothing shows through where the theme fill was skipped
+        cr.get_source().set_extend(cairo.EXTEND_PAD)
+        cr.paint()
+        cr.restore()
 
-        # Layer 1: Theme background color (always painted)
-        cr.set_source_rgba(*FLOWGRAPH_BACKGROUND_COLOR)
-        cr.rectangle(0, 0, width, height)
-        cr.fill()
-
-        # Layer 2: User background image
-        bg = _load_bg_surface()
-        if bg is not None:
-            bg_w = bg.get_width()
-            bg_h = bg.get_height()
-            if bg_w > 0 and bg_h > 0:
-                cr.save()
-                cr.scale(width / bg_w, height / bg_h)
-                cr.set_source_surface(bg, 0, 0)
-                cr.paint()
-                cr.restore()
-
-        # Layer 3: User background color override (on top of everything)
-        bg_color = _load_bg_color()
-        if bg_color is not None:
-            cr.set_source_rgba(*bg_color)
-            cr.rectangle(0, 0, width, height)
-            cr.fill()
+    def _build_draw_layers(self, plan):
+        """
+        Collect the painters for the canvas layers drawn before zoom.
+        Effect settings only change on restart and the background only on
+        reload_bg(), so this runs once instead of re-deciding every frame.
+        """
+        kind, fill, bg = plan
+        layers = []
+
+        fill_pattern = cairo.SolidPattern(*fill) if fill is not None else None
+
+        def paint_fill(cr, width, height):
+            # paint() covers the clip without building a rectangle path
+            cr.set_source(fill_pattern)
+            cr.paint()
+
+        def paint_image(cr, width, height):
+            self._paint_bg_image(cr, bg, width, height)
+
+        # Layers 1-3: theme color, user image, user color override.
+        # Only the layers that remain visible are painted.
+        if kind != PLAN_IMAGE_ONLY:
+            layers.append(paint_fill)
+        if kind != PLAN_COLOR_ONLY:
+            layers.append(paint_image)
 
         # Layer 4: Grid overlay (before zoom, covers full canvas)
         if _fx_on('grid_overlay'):
-            self._draw_grid_overlay(cr, width, height)
+            layers.append(self._draw_grid_overlay)
 
         # Layer 5: Ambient particles (before zoom, full canvas)
         if _fx_on('ambient_particles'):
-            self._draw_ambient_particles(cr, width, height)
+            layers.append(self._draw_ambient_particles)
 
-        cr.scale(self.zoom_factor, self.zoom_factor)
-        cr.set_line_width(2.0 / self.zoom_factor)
+        self._draw_layers = tuple(layers)
+        self._draw_layers_plan = plan
 
-        if self._update_after_zoom:
-            self._flow_graph.create_labels(cr)
-            self._flow_graph.create_shapes()
-            self._update_size()
-            self._update_after_zoom = False
+    def draw(self, widget, cr):
+        width = widget.get_allocated_width()
+        height = widget.get_allocated_height()
 
-        self._flow_graph.draw(cr)
+        if effects is not None:
+            effects.begin_frame()
+        try:
+            plan = _load_bg_plan()
+            if plan is not self._draw_layers_plan:
+                self._build_draw_layers(plan)
+            for paint_layer in self._draw_layers:
+                paint_layer(cr, width, height)
+
+            cr.scale(self.zoom_factor, self.zoom_factor)
+            cr.set_line_width(2.0 / self.zoom_factor)
+
+            if self._update_after_zoom:
+                self._flow_graph.create_labels(cr)
+                self._flow_graph.create_shapes()
+                self._extents_size = None
+                self._update_size()
+                self._update_after_zoom = False
+
+            self._flow_graph.draw(cr)
+        finally:
+            if effects is not None:
+                effects.end_frame()
 
     def _translate_event_coords(self, event):
         return event.x / self.zoom_factor, event.y / self.zoom_factor
@@ -10,10 +10,14 @@ Provides:
 """
 
 import cairo
+import functools
+import heapq
 import json
 import math
-import random
+import numpy as np
+import os
 import time
+import weakref
 from pathlib import Path
 
 _GNURADIO_DIR = Path.home() / ".gnuradio"
@@ -32,16 +36,35 @@ _DEFAULTS = {
     "click_sound": "off",           # "off", "sonar", "click", "coin", "laser", "blip"
     "click_ripple": True,
     "toolbar_css": True,
+    "selection_css": True,
 }
 
 _config = None
+_config_mtime = None   # st_mtime_ns of the file _config was read from
+_saved_bytes = None    # what save() last wrote
+
+# Validated string settings, recomputed whenever _config changes
+AMBIENT_MODE = 'off'
+CLICK_SOUND = 'off'
+
+# Flags read for every connection on every frame, kept as plain globals
+CONNECTION_GRADIENT = False
+DATA_FLOW_PARTICLES = False
+
+
+def _file_mtime():
+    try:
+        return _EFFECTS_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
 
 
 def _load():
-    global _config
+    global _config, _config_mtime
     if _config is not None:
         return
     _config = dict(_DEFAULTS)
+    _config_mtime = _file_mtime()
     if _EFFECTS_PATH.is_file():
         try:
             with open(_EFFECTS_PATH) as f:
@@ -61,6 +84,22 @@ def _load():
                         _config[k] = "bubbles"
         except Exception:
             pass
+    _update_modes()
+
+
+def _update_modes():
+    global AMBIENT_MODE, CLICK_SOUND, CONNECTION_GRADIENT, DATA_FLOW_PARTICLES
+    val = _config.get('ambient_particles', 'off')
+    if val in _VALID_AMBIENT:
+        AMBIENT_MODE = val
+    elif val is True:
+        AMBIENT_MODE = 'bubbles'
+    else:
+        AMBIENT_MODE = 'off'
+    val = _config.get('click_sound', 'off')
+    CLICK_SOUND = val if val in _VALID_SOUNDS else 'off'
+    CONNECTION_GRADIENT = bool(_config.get('connection_gradient', False))
+    DATA_FLOW_PARTICLES = bool(_config.get('data_flow_particles', False))
 
 
 def is_enabled(name):
@@ -70,20 +109,32 @@ def is_enabled(name):
 
 
 def reload():
-    """Force re-read of config from disk."""
+    """Re-read config from disk if the file changed since it was loaded."""
     global _config
+    if _config is not None and _file_mtime() == _config_mtime:
+        return
     _config = None
     _load()
 
 
 def save(overrides=None):
     """Write current config (optionally merged with overrides) to disk."""
+    global _config_mtime, _saved_bytes
     _load()
     if overrides:
         _config.update(overrides)
+        _update_modes()
+    data = json.dumps(_config, indent=2).encode('utf-8')
+    if data == _saved_bytes and _file_mtime() == _config_mtime:
+        return  # the file already holds exactly this
     _GNURADIO_DIR.mkdir(parents=True, exist_ok=True)
-    with open(_EFFECTS_PATH, "w") as f:
-        json.dump(_config, f, indent=2)
+    # Write a sibling temp file and rename it over the config, so a crash
+    # mid-write never leaves GRC with a truncated file
+    tmp = _EFFECTS_PATH.with_suffix('.json.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, _EFFECTS_PATH)
+    _saved_bytes = data
+    _config_mtime = _file_mtime()
 
 
 _VALID_SOUNDS = ('off', 'sonar', 'click', 'coin', 'laser', 'blip')
@@ -96,21 +147,13 @@ _VALID_AMBIENT = ('off', 'matrix_rain', 'bubbles', 'snow',
 def get_ambient_mode():
     """Return the ambient particle mode/type string."""
     _load()
-    val = _config.get('ambient_particles', 'off')
-    if val in _VALID_AMBIENT:
-        return val
-    if val is True:
-        return 'bubbles'
-    return 'off'
+    return AMBIENT_MODE
 
 
 def get_click_sound():
     """Return the click sound type string."""
     _load()
-    val = _config.get('click_sound', 'off')
-    if val in _VALID_SOUNDS:
-        return val
-    return 'off'
+    return CLICK_SOUND
 
 
 def get_all():
@@ -121,473 +164,624 @@ def get_all():
 
 # ─── Ambient Particle System ─────────────────────────────────────────────────
 
-class _Particle:
-    __slots__ = ('x', 'y', 'vx', 'vy', 'size', 'alpha', 'life', 'char',
-                 'seed', 'max_life', 'x2', 'y2', 'angle', 'segments')
+# Per-particle state is kept as one NumPy column per field (structure of
+# arrays) so physics runs as a few vectorized ops instead of a Python loop.
+# 'kind' is a per-type variant: the digit shown for matrix_rain, and
+# _KIND_FLAME/_KIND_EMBER for fire. Starfield keeps its direction as a
+# unit vector (ux, uy) and its distance from the centre in 'dist'.
+_COLUMNS = ('x', 'y', 'vx', 'vy', 'size', 'alpha', 'life', 'max_life',
+            'seed', 'ux', 'uy', 'dist', 'kind')
+
+_KIND_FLAME = 0
+_KIND_EMBER = 1
+
+# Per-type particle budgets (others use the system's max_particles) and
+# particles spawned per step
+_MAX_CAP = 250
+_AMBIENT_CAPS = {
+    'fire': _MAX_CAP, 'matrix_rain': 200, 'starfield': 180,
+    'lightning': 8, 'scanline': 3, 'glitch': 15,
+}
+_SPAWN_RATES = {
+    'matrix_rain': 4, 'snow': 3, 'bubbles': 2,
+    'confetti': 3, 'sparks': 4, 'dust': 2, 'fire': 6,
+    'fireflies': 1, 'lightning': 1, 'starfield': 5,
+    'scanline': 1, 'glitch': 2, 'off': 0,
+}
+
+# Fire motion coefficients, indexed by kind (flame, ember)
+_FIRE_WAVE_FREQ = np.array([1.0, 1.2])
+_FIRE_WAVE_AMP = np.array([40.0, 15.0])
+_FIRE_LIFT_MIN = np.array([5.0, 0.0])
+_FIRE_LIFT_SPAN = np.array([15.0, 10.0])
+_FIRE_DRAG = np.array([1.5, 0.0])
+
+
+def _ember_rgb(age):
+    # Color: bright yellow → orange → red
+    if age < 0.4:
+        return 1.0, 0.85, 0.3
+    if age < 0.7:
+        t2 = (age - 0.4) / 0.3
+        return 1.0, 0.85 - t2 * 0.5, 0.3 - t2 * 0.3
+    t2 = (age - 0.7) / 0.3
+    return 1.0 - t2 * 0.4, 0.35 - t2 * 0.25, 0.0
+
+
+def _flame_rgb(age):
+    # Smooth color: white-yellow → orange → red → dark
+    if age < 0.15:
+        return 1.0, 0.97, 0.7
+    if age < 0.35:
+        t2 = (age - 0.15) / 0.2
+        return 1.0, 0.97 - t2 * 0.42, 0.7 - t2 * 0.7   # → 1.0, 0.55, 0.0
+    if age < 0.6:
+        t2 = (age - 0.35) / 0.25
+        return 1.0 - t2 * 0.15, 0.55 - t2 * 0.35, 0.0  # → 0.85, 0.2
+    if age < 0.85:
+        t2 = (age - 0.6) / 0.25
+        return 0.85 - t2 * 0.35, 0.2 - t2 * 0.15, 0.0  # → 0.5, 0.05
+    t2 = (age - 0.85) / 0.15
+    return 0.5 - t2 * 0.3, 0.05 - t2 * 0.05, 0.0
+
+
+# Fire colour ramps sampled at 256 ages (0 = just born, 1 = dying); the
+# draw path indexes them with int(age * 255) instead of re-evaluating the
+# piecewise ramps per particle per frame.
+_FIRE_LUT_SIZE = 256
+_FIRE_AGES = np.linspace(0.0, 1.0, _FIRE_LUT_SIZE)
+_FIRE_RAMP_EMBER = np.array([_ember_rgb(a) for a in _FIRE_AGES.tolist()])
+_FIRE_RAMP_FLAME = np.array([_flame_rgb(a) for a in _FIRE_AGES.tolist()])
+# Flames shrink and grow taller as they rise, and fade out quadratically
+_FIRE_SZ_LUT = 0.35 + 0.65 * (1.0 - _FIRE_AGES)
+_FIRE_STRETCH_LUT = 1.4 + 1.0 * (1.0 - _FIRE_AGES)
+_FIRE_FALPHA_LUT = 1.0 - _FIRE_AGES ** 2
+_EMBER_ALPHA_LUT = 1.0 - _FIRE_AGES * 0.7
+
+# Flame gradients are built in unit space (the flame's transform scales
+# them to size) and shared between particles of similar age and fade.
+_FLAME_AGE_BUCKETS = 32
+_flame_gradients = {}
+
+
+def _get_flame_gradients(bucket, level):
+    """Return the (glow, core) patterns for an age bucket and alpha level."""
+    key = (bucket, level)
+    pats = _flame_gradients.get(key)
+    if pats is None:
+        step = _FIRE_LUT_SIZE // _FLAME_AGE_BUCKETS
+        fr, fg, fb = _FIRE_RAMP_FLAME[bucket * step + step // 2].tolist()
+        fa = level / _ALPHA_LEVELS
+        # Outer glow (large, very soft)
+        glow = cairo.RadialGradient(0, -0.15, 0, 0, 0, 1.3)
+        glow.add_color_stop_rgba(0.0, fr, fg, fb, fa * 0.35)
+        glow.add_color_stop_rgba(0.6, fr * 0.8, fg * 0.4, 0, fa * 0.12)
+        glow.add_color_stop_rgba(1.0, 0.2, 0, 0, 0)
+        # Core flame (bright center offset upward)
+        core = cairo.RadialGradient(0, -0.25, 0.08, 0, 0.05, 0.85)
+        core.add_color_stop_rgba(0.0, min(1, fr + 0.1), min(1, fg + 0.1),
+                                 min(1, fb + 0.15), min(1.0, fa * 1.2))
+        core.add_color_stop_rgba(0.4, fr, fg * 0.6, 0, fa * 0.6)
+        core.add_color_stop_rgba(1.0, fr * 0.3, 0, 0, 0)
+        pats = _flame_gradients[key] = (glow, core)
+    return pats
+
+
+@functools.lru_cache(maxsize=64)
+def _hex_to_rgb(color_hex):
+    """Parse '#RRGGBB' into cairo (r, g, b) floats."""
+    hx = color_hex.lstrip('#')
+    return (int(hx[0:2], 16) / 255.0,
+            int(hx[2:4], 16) / 255.0,
+            int(hx[4:6], 16) / 255.0)
+
+
+# Dots are batched into one path per alpha level; this many levels is
+# visually indistinguishable from per-particle alpha.
+_ALPHA_LEVELS = 16
+
+
+def _alpha_buckets(alphas):
+    """Yield (alpha, mask) for each quantized alpha level in use."""
+    levels = (alphas * _ALPHA_LEVELS + 0.5).astype(np.int64)
+    # Anything that rounds to level 0 is skipped rather than brightened
+    visible = levels > 0
+    for level in np.unique(levels[visible]).tolist():
+        yield level / _ALPHA_LEVELS, visible & (levels == level)
+
+
+def _fill_dots(cr, xs, ys, radii, alphas, r, g, b, alpha_scale=1.0):
+    """Fill one circle per particle with a single fill per alpha level."""
+    for alpha, sel in _alpha_buckets(alphas):
+        for x, y, radius in zip(xs[sel].tolist(), ys[sel].tolist(),
+                                radii[sel].tolist()):
+            cr.new_sub_path()
+            cr.arc(x, y, radius, 0, 2 * math.pi)
+        cr.set_source_rgba(r, g, b, alpha * alpha_scale)
+        cr.fill()
+
+
+def _fill_rects(cr, xs, ys, widths, heights, alphas, r, g, b,
+                alpha_scale=1.0):
+    """Fill one rectangle per particle with a single fill per alpha level."""
+    for alpha, sel in _alpha_buckets(alphas):
+        for x, y, rw, rh in zip(xs[sel].tolist(), ys[sel].tolist(),
+                                widths[sel].tolist(), heights[sel].tolist()):
+            cr.rectangle(x, y, rw, rh)
+        cr.set_source_rgba(r, g, b, alpha * alpha_scale)
+        cr.fill()
+
+
+def _stroke_rings(cr, xs, ys, radii, alphas, r, g, b, line_width):
+    """Stroke one circle outline per particle, one stroke per alpha level."""
+    cr.set_line_width(line_width)
+    for alpha, sel in _alpha_buckets(alphas):
+        for x, y, radius in zip(xs[sel].tolist(), ys[sel].tolist(),
+                                radii[sel].tolist()):
+            cr.new_sub_path()
+            cr.arc(x, y, radius, 0, 2 * math.pi)
+        cr.set_source_rgba(r, g, b, alpha)
+        cr.stroke()
+
+
+def _stroke_lines(cr, x0s, y0s, x1s, y1s, widths, alphas, r, g, b,
+                  alpha_scale=1.0):
+    """Stroke one line per particle, one stroke per (alpha, width) pair.
+
+    Widths are rounded to quarter pixels so particles can share a stroke.
+    """
+    quarters = (widths * 4 + 0.5).astype(np.int64)
+    # Lines thinner than an eighth of a pixel are skipped, not widened
+    drawn = quarters > 0
+    for alpha, sel in _alpha_buckets(alphas):
+        sel = sel & drawn
+        for q in np.unique(quarters[sel]).tolist():
+            batch = sel & (quarters == q)
+            for x0, y0, x1, y1 in zip(x0s[batch].tolist(), y0s[batch].tolist(),
+                                      x1s[batch].tolist(), y1s[batch].tolist()):
+                cr.move_to(x0, y0)
+                cr.line_to(x1, y1)
+            cr.set_line_width(q / 4)
+            cr.set_source_rgba(r, g, b, alpha * alpha_scale)
+            cr.stroke()
 
 
 class AmbientParticleSystem:
-    """Manages ambient background particles. Call tick_and_draw() each frame."""
+    """Manages ambient background particles.
+
+    The simulation and the rendering are split: step() advances the
+    particles and is driven by the animation timer, draw() renders the
+    current state from the expose handler. Redraws triggered by anything
+    else (scrolling, hovering) therefore cost no physics.
+    tick_and_draw() does both for callers that own a single draw loop.
+    """
 
     def __init__(self, max_particles=120):
-        self._particles = []
         self._max = max_particles
+        # Columns live in fixed buffers sized for the largest per-type cap;
+        # self.x etc. are views of the first self._n rows, so spawning and
+        # culling copy into place instead of reallocating every frame.
+        capacity = max(max_particles, _MAX_CAP)
+        self._buffers = {
+            name: np.zeros(capacity, np.int8 if name == 'kind' else np.float64)
+            for name in _COLUMNS}
+        self._n = 0
+        self._update_views()
+        self.segments = []  # lightning zigzag arrays, parallel to the columns
+        self._rng = np.random.default_rng()
         self._last_tick = 0
         self._time = 0
+        self._dt = 0.033
+
+    def __len__(self):
+        return self._n
+
+    def _update_views(self):
+        n = self._n
+        for name, buf in self._buffers.items():
+            setattr(self, name, buf[:n])
 
     def tick_and_draw(self, cr, w, h, ptype, color_hex):
-        """Update and draw particles. ptype is one of:
-        matrix_rain, snow, bubbles, confetti, sparks, dust"""
+        """Update and draw particles in one go. ptype is one of
+        _VALID_AMBIENT (except 'off')."""
+        self.step(w, h, ptype)
+        self.draw(cr, w, h, ptype, color_hex)
+
+    def _spawn(self, w, h, ptype, n):
+        """Append n new particles of the given type."""
+        rng = self._rng
+        uniform = rng.uniform
+        zeros = np.zeros(n)
+        life = np.ones(n)
+        seed = zeros
+        ux = uy = dist = zeros
+        kind = np.zeros(n, np.int8)
+        segments = [None] * n
+        if ptype == 'matrix_rain':
+            x = uniform(0, w, n)
+            y = uniform(-20, -5, n)
+            vx = zeros
+            vy = uniform(120, 300, n)
+            size = uniform(16, 28, n)
+            alpha = uniform(0.3, 0.9, n)
+            life = np.full(n, 99.0)   # killed by going off-screen, not life
+            kind = rng.integers(0, 2, n, dtype=np.int8)
+        elif ptype == 'snow':
+            x = uniform(0, w, n)
+            y = np.full(n, -5.0)
+            vx = uniform(-20, 20, n)
+            vy = uniform(30, 80, n)
+            size = uniform(2, 5, n)
+            alpha = uniform(0.4, 0.8, n)
+        elif ptype == 'bubbles':
+            x = uniform(0, w, n)
+            y = np.full(n, h + 5.0)
+            vx = uniform(-10, 10, n)
+            vy = uniform(-80, -40, n)
+            size = uniform(3, 8, n)
+            alpha = uniform(0.2, 0.5, n)
+        elif ptype == 'confetti':
+            x = uniform(0, w, n)
+            y = np.full(n, -5.0)
+            vx = uniform(-30, 30, n)
+            vy = uniform(60, 140, n)
+            size = uniform(3, 6, n)
+            alpha = uniform(0.5, 0.9, n)
+        elif ptype == 'sparks':
+            x = uniform(0, w, n)
+            y = np.full(n, h + 2.0)
+            vx = uniform(-40, 40, n)
+            vy = uniform(-120, -60, n)
+            size = uniform(1.5, 3.5, n)
+            alpha = uniform(0.6, 1.0, n)
+        elif ptype == 'fire':
+            # Mix of flame body + embers for realism: embers are tiny bright
+            # dots that rise high, flames are clustered at the bottom
+            ember = rng.random(n) < 0.12
+            kind = np.where(ember, _KIND_EMBER, _KIND_FLAME).astype(np.int8)
+            x = rng.normal(w * 0.5, np.where(ember, w * 0.25, w * 0.22))
+            y = h + np.where(ember, uniform(-5, 5, n), uniform(-2, 8, n))
+            vx = np.where(ember, uniform(-15, 15, n), uniform(-5, 5, n))
+            vy = np.where(ember, uniform(-140, -60, n), uniform(-80, -20, n))
+            size = np.where(ember, uniform(1.0, 2.5, n), uniform(14, 40, n))
+            alpha = np.where(ember, uniform(0.7, 1.0, n), uniform(0.3, 0.7, n))
+            life = np.where(ember, uniform(1.5, 3.0, n), uniform(1.2, 2.5, n))
+            seed = uniform(0, 100, n)
+        elif ptype == 'fireflies':
+            x = uniform(0, w, n)
+            y = uniform(0, h, n)
+            vx = uniform(-15, 15, n)
+            vy = uniform(-15, 15, n)
+            size = uniform(2, 5, n)
+            alpha = uniform(0.1, 0.8, n)
+            life = uniform(3.0, 8.0, n)
+            seed = uniform(0, 100, n)
+        elif ptype == 'lightning':
+            # A bolt: start at top, zig-zag down
+            x = uniform(w * 0.1, w * 0.9, n)
+            y = zeros
+            x2 = x + uniform(-80, 80, n)
+            y2 = uniform(h * 0.4, h, n)
+            vx = vy = zeros
+            size = uniform(1.5, 3.0, n)
+            alpha = uniform(0.7, 1.0, n)
+            life = uniform(0.15, 0.35, n)
+            seed = rng.random(n)
+            # Pre-generate zigzag points as (steps + 1, 2) arrays; the first
+            # point is the bolt's origin (t = 0, no jitter)
+            for i, steps in enumerate(rng.integers(5, 13, n).tolist()):
+                t = np.linspace(0.0, 1.0, steps + 1)
+                jitter = uniform(-30, 30, steps + 1)
+                jitter[0] = 0.0
+                segments[i] = np.column_stack(
+                    (x[i] + (x2[i] - x[i]) * t + jitter, y2[i] * t))
+        elif ptype == 'starfield':
+            # Stars radiate outward from center
+            angle = uniform(0, 2 * math.pi, n)
+            dist = uniform(5, 30, n)
+            ux, uy = np.cos(angle), np.sin(angle)
+            x = w / 2 + ux * dist
+            y = h / 2 + uy * dist
+            speed = uniform(150, 400, n)
+            vx = ux * speed
+            vy = uy * speed
+            size = uniform(1, 2.5, n)
+            alpha = uniform(0.3, 0.9, n)
+            life = np.full(n, 99.0)  # dies off-screen
+        elif ptype == 'scanline':
+            x = zeros
+            y = np.full(n, -2.0)
+            vx = zeros
+            vy = uniform(80, 160, n)
+            size = uniform(1, 3, n)
+            alpha = uniform(0.3, 0.6, n)
+            life = np.full(n, 99.0)  # dies off-screen
+        elif ptype == 'glitch':
+            x = uniform(0, max(w - 60, 0), n)
+            y = uniform(0, max(h - 10, 0), n)
+            vx = uniform(30, 100, n)  # width
+            vy = uniform(3, 12, n)     # height
+            size = zeros
+            alpha = uniform(0.15, 0.5, n)
+            life = uniform(0.05, 0.2, n)
+            seed = rng.random(n)
+        else:  # dust
+            x = uniform(0, w, n)
+            y = uniform(0, h, n)
+            vx = uniform(-8, 8, n)
+            vy = uniform(-4, 4, n)
+            size = uniform(1, 3, n)
+            alpha = uniform(0.15, 0.35, n)
+
+        new = {'x': x, 'y': y, 'vx': vx, 'vy': vy, 'size': size,
+               'alpha': alpha, 'life': life, 'max_life': life, 'seed': seed,
+               'ux': ux, 'uy': uy, 'dist': dist, 'kind': kind}
+        start = self._n
+        for name, buf in self._buffers.items():
+            buf[start:start + n] = new[name]
+        self._n = start + n
+        self._update_views()
+        self.segments.extend(segments)
+
+    def step(self, w, h, ptype):
+        """Spawn, move and cull particles for a canvas of w x h."""
+        if ptype == 'off' and not len(self):
+            return  # nothing to spawn, move or age
         now = time.time()
         dt = min(now - self._last_tick, 0.1) if self._last_tick else 0.033
         self._last_tick = now
         self._time += dt
-
-        # Parse color
-        hx = color_hex.lstrip('#')
-        r = int(hx[0:2], 16) / 255.0
-        g = int(hx[2:4], 16) / 255.0
-        b = int(hx[4:6], 16) / 255.0
-
-        # Particle budget per type
-        if ptype == 'fire':
-            cap = 250
-        elif ptype == 'matrix_rain':
-            cap = 200
-        elif ptype == 'starfield':
-            cap = 180
-        elif ptype == 'lightning':
-            cap = 8
-        elif ptype == 'scanline':
-            cap = 3
-        elif ptype == 'glitch':
-            cap = 15
+        self._dt = dt
+
+        # Spawn new particles, within the type's budget
+        cap = _AMBIENT_CAPS.get(ptype, self._max)
+        count = min(_SPAWN_RATES.get(ptype, 2), cap - len(self))
+        if count > 0:
+            self._spawn(w, h, ptype, count)
+
+        # Update and cull, vectorized over all particles
+        n = len(self)
+        if not n:
+            return
+        x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+        x += vx * dt
+        y += vy * dt
+
+        # Confetti: add wobble
+        if ptype == 'confetti':
+            vx += self._rng.uniform(-50, 50, n) * dt
+
+        # Life decay (matrix_rain/starfield/scanline die off-screen only)
+        if ptype == 'starfield':
+            # Stars fly straight out, so the distance grows by the speed
+            self.dist += (self.ux * vx + self.uy * vy) * dt
+        elif ptype in ('matrix_rain', 'scanline'):
+            pass
+        elif ptype == 'sparks':
+            life -= dt * 1.2
+        elif ptype == 'fire':
+            life -= dt
+            # Sinusoidal licking motion — each particle has unique phase
+            # (flame and ember coefficients are looked up by kind, so
+            # there is no branch and a single random draw)
+            kind = self.kind
+            t_wave = self._time * 1.8 + self.seed
+            vx += np.sin(t_wave * _FIRE_WAVE_FREQ[kind]) * _FIRE_WAVE_AMP[kind] * dt
+            vy -= (_FIRE_LIFT_MIN[kind] +
+                   self._rng.random(n) * _FIRE_LIFT_SPAN[kind]) * dt
+            vx *= 1.0 - _FIRE_DRAG[kind] * dt
+        elif ptype == 'fireflies':
+            life -= dt * 0.2
+            # Wander randomly
+            wander = self._rng.uniform(-30, 30, (2, n)) * dt
+            vx += wander[0]
+            vy += wander[1]
+            vx *= 0.95
+            vy *= 0.95
+            # Pulsing glow via alpha
+            self.alpha[:] = 0.15 + 0.65 * (0.5 + 0.5 * np.sin(
+                self._time * 3.0 + self.seed))
+        elif ptype in ('lightning', 'glitch'):
+            life -= dt
+        elif ptype == 'dust':
+            life -= dt * 0.3
         else:
-            cap = self._max
-
-        # Spawn new particles
-        spawn_rate = {
-            'matrix_rain': 4, 'snow': 3, 'bubbles': 2,
-            'confetti': 3, 'sparks': 4, 'dust': 2, 'fire': 6,
-            'fireflies': 1, 'lightning': 1, 'starfield': 5,
-            'scanline': 1, 'glitch': 2,
-        }.get(ptype, 2)
-
-        for _ in range(spawn_rate):
-            if len(self._particles) >= cap:
-                break
-            p = _Particle()
-            p.life = 1.0
-            p.seed = 0
-            p.max_life = 1.0
-            if ptype == 'matrix_rain':
-                p.x = random.uniform(0, w)
-                p.y = random.uniform(-20, -5)
-                p.vx = 0
-                p.vy = random.uniform(120, 300)
-                p.size = random.uniform(16, 28)
-                p.alpha = random.uniform(0.3, 0.9)
-                p.life = 99.0   # killed by going off-screen, not life
-                p.max_life = 99.0
-                p.char = random.choice('01')
-            elif ptype == 'snow':
-                p.x = random.uniform(0, w)
-                p.y = -5
-                p.vx = random.uniform(-20, 20)
-                p.vy = random.uniform(30, 80)
-                p.size = random.uniform(2, 5)
-                p.alpha = random.uniform(0.4, 0.8)
-                p.char = None
-            elif ptype == 'bubbles':
-                p.x = random.uniform(0, w)
-                p.y = h + 5
-                p.vx = random.uniform(-10, 10)
-                p.vy = random.uniform(-40, -80)
-                p.size = random.uniform(3, 8)
-                p.alpha = random.uniform(0.2, 0.5)
-                p.char = None
-            elif ptype == 'confetti':
-                p.x = random.uniform(0, w)
-                p.y = -5
-                p.vx = random.uniform(-30, 30)
-                p.vy = random.uniform(60, 140)
-                p.size = random.uniform(3, 6)
-                p.alpha = random.uniform(0.5, 0.9)
-                p.char = None
-            elif ptype == 'sparks':
-                p.x = random.uniform(0, w)
-                p.y = h + 2
-                p.vx = random.uniform(-40, 40)
-                p.vy = random.uniform(-120, -60)
-                p.size = random.uniform(1.5, 3.5)
-                p.alpha = random.uniform(0.6, 1.0)
-                p.char = None
-            elif ptype == 'fire':
-                # Mix of flame body + embers for realism
-                is_ember = random.random() < 0.12
-                if is_ember:
-                    # Tiny bright ember that rises high
-                    p.x = random.gauss(w * 0.5, w * 0.25)
-                    p.y = h + random.uniform(-5, 5)
-                    p.vx = random.uniform(-15, 15)
-                    p.vy = random.uniform(-140, -60)
-                    p.size = random.uniform(1.0, 2.5)
-                    p.alpha = random.uniform(0.7, 1.0)
-                    p.char = 'e'  # ember
-                    p.life = random.uniform(1.5, 3.0)
-                else:
-                    # Main flame body — clustered at bottom
-                    p.x = random.gauss(w * 0.5, w * 0.22)
-                    p.y = h + random.uniform(-2, 8)
-                    p.vx = random.uniform(-5, 5)
-                    p.vy = random.uniform(-80, -20)
-                    p.size = random.uniform(14, 40)
-                    p.alpha = random.uniform(0.3, 0.7)
-                    p.char = 'f'  # flame
-                    p.life = random.uniform(1.2, 2.5)
-                p.seed = random.uniform(0, 100)
-                p.max_life = p.life
-            elif ptype == 'fireflies':
-                p.x = random.uniform(0, w)
-                p.y = random.uniform(0, h)
-                p.vx = random.uniform(-15, 15)
-                p.vy = random.uniform(-15, 15)
-                p.size = random.uniform(2, 5)
-                p.alpha = random.uniform(0.1, 0.8)
-                p.life = random.uniform(3.0, 8.0)
-                p.max_life = p.life
-                p.seed = random.uniform(0, 100)
-                p.char = None
-            elif ptype == 'lightning':
-                # A bolt: start at top, zig-zag down
-                p.x = random.uniform(w * 0.1, w * 0.9)
-                p.y = 0
-                p.x2 = p.x + random.uniform(-80, 80)
-                p.y2 = random.uniform(h * 0.4, h)
-                p.vx = 0
-                p.vy = 0
-                p.size = random.uniform(1.5, 3.0)
-                p.alpha = random.uniform(0.7, 1.0)
-                p.life = random.uniform(0.15, 0.35)
-                p.max_life = p.life
-                p.seed = random.random()
-                p.char = 'L'
-                # Pre-generate zigzag segments
-                segs = [(p.x, p.y)]
-                cx, cy = p.x, p.y
-                steps = random.randint(5, 12)
-                for si in range(steps):
-                    t = (si + 1) / steps
-                    tx = p.x + (p.x2 - p.x) * t
-                    ty = p.y + (p.y2 - p.y) * t
-                    cx = tx + random.uniform(-30, 30)
-                    cy = ty
-                    segs.append((cx, cy))
-                p.segments = segs
-            elif ptype == 'starfield':
-                # Stars radiate outward from center
-                angle = random.uniform(0, 2 * math.pi)
-                dist = random.uniform(5, 30)
-                cx, cy = w / 2, h / 2
-                p.x = cx + math.cos(angle) * dist
-                p.y = cy + math.sin(angle) * dist
-                speed = random.uniform(150, 400)
-                p.vx = math.cos(angle) * speed
-                p.vy = math.sin(angle) * speed
-                p.size = random.uniform(1, 2.5)
-                p.alpha = random.uniform(0.3, 0.9)
-                p.life = 99.0  # dies off-screen
-                p.max_life = 99.0
-                p.char = None
-                p.angle = angle
-            elif ptype == 'scanline':
-                p.x = 0
-                p.y = -2
-                p.vx = 0
-                p.vy = random.uniform(80, 160)
-                p.size = random.uniform(1, 3)
-                p.alpha = random.uniform(0.3, 0.6)
-                p.life = 99.0  # dies off-screen
-                p.max_life = 99.0
-                p.char = 'S'
-            elif ptype == 'glitch':
-                p.x = random.uniform(0, w - 60)
-                p.y = random.uniform(0, h - 10)
-                p.vx = random.uniform(30, 100)  # width
-                p.vy = random.uniform(3, 12)     # height
-                p.size = 0
-                p.alpha = random.uniform(0.15, 0.5)
-                p.life = random.uniform(0.05, 0.2)
-                p.max_life = p.life
-                p.seed = random.random()
-                p.char = 'G'
-            else:  # dust
-                p.x = random.uniform(0, w)
-                p.y = random.uniform(0, h)
-                p.vx = random.uniform(-8, 8)
-                p.vy = random.uniform(-4, 4)
-                p.size = random.uniform(1, 3)
-                p.alpha = random.uniform(0.15, 0.35)
-                p.char = None
-            self._particles.append(p)
-
-        # Update and draw
-        alive = []
-        for p in self._particles:
-            p.x += p.vx * dt
-            p.y += p.vy * dt
-
-            # Confetti: add wobble
-            if ptype == 'confetti':
-                p.vx += random.uniform(-50, 50) * dt
-
-            # Life decay (matrix_rain/starfield/scanline die off-screen only)
-            if ptype in ('matrix_rain', 'starfield', 'scanline'):
-                pass
-            elif ptype == 'sparks':
-                p.life -= dt * 1.2
-            elif ptype == 'fire':
-                p.life -= dt
-                # Sinusoidal licking motion — each particle has unique phase
-                t_wave = self._time * 1.8 + getattr(p, 'seed', 0)
-                if getattr(p, 'char', '') == 'f':
-                    p.vx += math.sin(t_wave) * 40 * dt
-                    p.vy -= random.uniform(5, 20) * dt
-                    p.vx *= (1.0 - 1.5 * dt)
-                else:
-                    p.vx += math.sin(t_wave * 1.2) * 15 * dt
-                    p.vy -= random.uniform(0, 10) * dt
-            elif ptype == 'fireflies':
-                p.life -= dt * 0.2
-                # Wander randomly
-                p.vx += random.uniform(-30, 30) * dt
-                p.vy += random.uniform(-30, 30) * dt
-                p.vx *= 0.95
-                p.vy *= 0.95
-                # Pulsing glow via alpha
-                seed = getattr(p, 'seed', 0)
-                p.alpha = 0.15 + 0.65 * (0.5 + 0.5 * math.sin(
-                    self._time * 3.0 + seed))
-            elif ptype in ('lightning', 'glitch'):
-                p.life -= dt
-            elif ptype == 'dust':
-                p.life -= dt * 0.3
-            else:
-                p.life -= dt * 0.4
-
-            if p.life <= 0 or p.y > h + 20 or p.y < -20 or p.x < -20 or p.x > w + 20:
+            life -= dt * 0.4
+
+        alive = ((life > 0) & (y <= h + 20) & (y >= -20) &
+                 (x >= -20) & (x <= w + 20))
+        if not alive.all():
+            keep = int(np.count_nonzero(alive))
+            for name, buf in self._buffers.items():
+                buf[:keep] = getattr(self, name)[alive]
+            self._n = keep
+            self._update_views()
+            self.segments = [s for s, alive_flag in zip(self.segments, alive.tolist())
+                             if alive_flag]
+
+    def draw(self, cr, w, h, ptype, color_hex):
+        """Draw the particles as left by the last step()."""
+        if not len(self):
+            return
+
+        r, g, b = _hex_to_rgb(color_hex)
+        alphas = self.alpha * np.minimum(self.life, 1.0)
+        self._DRAWERS.get(ptype, AmbientParticleSystem._draw_dots)(
+            self, cr, w, h, r, g, b, alphas)
+
+    # Per-type renderers. Only confetti and fire transform the context, so
+    # only they pay for save()/restore(); the rest batch into shared paths.
+
+    def _draw_dots(self, cr, w, h, r, g, b, alphas):
+        # snow, dust, and anything unknown
+        _fill_dots(cr, self.x, self.y, self.size, alphas, r, g, b)
+
+    def _draw_matrix_rain(self, cr, w, h, r, g, b, alphas):
+        cr.select_font_face("monospace", 0, 0)
+        for px, py, size, alpha, kind in zip(
+                self.x.tolist(), self.y.tolist(), self.size.tolist(),
+                alphas.tolist(), self.kind.tolist()):
+            if alpha < 0.01:
+                continue
+            cr.set_source_rgba(r, g, b, alpha)
+            cr.set_font_size(size)
+            cr.move_to(px, py)
+            cr.show_text(str(kind))
+
+    def _draw_bubbles(self, cr, w, h, r, g, b, alphas):
+        _fill_dots(cr, self.x, self.y, self.size, alphas, r, g, b,
+                   alpha_scale=0.3)
+        _stroke_rings(cr, self.x, self.y, self.size, alphas, r, g, b, 0.8)
+
+    def _draw_confetti(self, cr, w, h, r, g, b, alphas):
+        for px, py, size, alpha, life in zip(
+                self.x.tolist(), self.y.tolist(), self.size.tolist(),
+                alphas.tolist(), self.life.tolist()):
+            if alpha < 0.01:
                 continue
-            alive.append(p)
+            # Small rotated rectangle
+            cr.save()
+            cr.translate(px, py)
+            cr.rotate(life * 6)
+            cr.rectangle(-size / 2, -size / 2, size, size * 0.6)
+            # Vary hue slightly per particle based on position
+            rr = min(1, r + (px % 0.4) - 0.2)
+            gg = min(1, g + (py % 0.3) - 0.15)
+            cr.set_source_rgba(rr, gg, b, alpha)
+            cr.fill()
+            cr.restore()
 
-            alpha = p.alpha * min(p.life, 1.0)
+    def _draw_sparks(self, cr, w, h, r, g, b, alphas):
+        # Small bright dot with a short trail
+        dt2 = self._dt * 2
+        _fill_dots(cr, self.x, self.y, self.size, alphas, r, g, b)
+        _stroke_lines(cr, self.x, self.y,
+                      self.x - self.vx * dt2, self.y - self.vy * dt2,
+                      self.size * 0.5, alphas, r, g, b, alpha_scale=0.5)
+
+    def _draw_fire(self, cr, w, h, r, g, b, alphas):
+        max_life = np.where(self.max_life, self.max_life, 1.0)
+        age = np.clip(1.0 - self.life / max_life, 0.0, 1.0)
+        idx = (age * (_FIRE_LUT_SIZE - 1)).astype(np.int64)
+        ember = self.kind == _KIND_EMBER
+        rgb = _FIRE_RAMP_EMBER[idx]  # flames take theirs from the gradients
+        # Ember alpha, or flame alpha; sizes and stretch only apply to flames
+        fade = alphas * np.where(ember, _EMBER_ALPHA_LUT[idx],
+                                 _FIRE_FALPHA_LUT[idx])
+        sizes = np.where(ember, self.size, self.size * _FIRE_SZ_LUT[idx])
+        buckets = idx * _FLAME_AGE_BUCKETS // _FIRE_LUT_SIZE
+        levels = (fade * _ALPHA_LEVELS + 0.5).astype(np.int64)
+
+        particles = zip(self.x.tolist(), self.y.tolist(), sizes.tolist(),
+                        alphas.tolist(), fade.tolist(), ember.tolist(),
+                        _FIRE_STRETCH_LUT[idx].tolist(), buckets.tolist(),
+                        levels.tolist(), rgb.tolist())
+        for (px, py, sz, alpha, fa, is_ember, stretch, bucket, level,
+             ember_rgb) in particles:
             if alpha < 0.01:
                 continue
 
-            cr.save()
-            if ptype == 'matrix_rain' and p.char:
-                cr.set_source_rgba(r, g, b, alpha)
-                cr.select_font_face("monospace", 0, 0)
-                cr.set_font_size(p.size)
-                cr.move_to(p.x, p.y)
-                cr.show_text(p.char)
-            elif ptype == 'bubbles':
-                cr.arc(p.x, p.y, p.size, 0, 2 * math.pi)
-                cr.set_source_rgba(r, g, b, alpha * 0.3)
-                cr.fill_preserve()
-                cr.set_source_rgba(r, g, b, alpha)
-                cr.set_line_width(0.8)
-                cr.stroke()
-            elif ptype == 'confetti':
-                # Small rotated rectangle
-                cr.translate(p.x, p.y)
-                cr.rotate(p.life * 6)
-                cr.rectangle(-p.size / 2, -p.size / 2, p.size, p.size * 0.6)
-                # Vary hue slightly per particle based on position
-                rr = min(1, r + (p.x % 0.4) - 0.2)
-                gg = min(1, g + (p.y % 0.3) - 0.15)
-                cr.set_source_rgba(rr, gg, b, alpha)
-                cr.fill()
-            elif ptype == 'sparks':
-                # Small bright dot with trail
-                cr.arc(p.x, p.y, p.size, 0, 2 * math.pi)
-                cr.set_source_rgba(r, g, b, alpha)
-                cr.fill()
-                # Tiny trail
-                cr.move_to(p.x, p.y)
-                cr.line_to(p.x - p.vx * dt * 2, p.y - p.vy * dt * 2)
-                cr.set_source_rgba(r, g, b, alpha * 0.5)
-                cr.set_line_width(p.size * 0.5)
-                cr.stroke()
-            elif ptype == 'fire':
-                ml = getattr(p, 'max_life', 1.0) or 1.0
-                age = 1.0 - (p.life / ml)  # 0 = just born, 1 = dying
-                age = max(0.0, min(1.0, age))
-
-                if getattr(p, 'char', '') == 'e':
-                    # ── Ember: tiny bright dot with short trail ──
-                    # Color: bright yellow → orange → red
-                    if age < 0.4:
-                        fr, fg, fb = 1.0, 0.85, 0.3
-                    elif age < 0.7:
-                        t2 = (age - 0.4) / 0.3
-                        fr, fg, fb = 1.0, 0.85 - t2 * 0.5, 0.3 - t2 * 0.3
-                    else:
-                        t2 = (age - 0.7) / 0.3
-                        fr, fg, fb = 1.0 - t2 * 0.4, 0.35 - t2 * 0.25, 0.0
-                    ea = alpha * (1.0 - age * 0.7)
-                    cr.arc(p.x, p.y, p.size, 0, 2 * math.pi)
-                    cr.set_source_rgba(fr, fg, fb, ea)
-                    cr.fill()
-                    # Glow halo
-                    cr.arc(p.x, p.y, p.size * 3, 0, 2 * math.pi)
-                    cr.set_source_rgba(fr, fg * 0.5, 0, ea * 0.15)
-                    cr.fill()
-                else:
-                    # ── Flame body: soft teardrop with color ramp ──
-                    # Smooth color: white-yellow → orange → red → dark
-                    if age < 0.15:
-                        fr, fg, fb = 1.0, 0.97, 0.7
-                    elif age < 0.35:
-                        t2 = (age - 0.15) / 0.2
-                        fr = 1.0
-                        fg = 0.97 - t2 * 0.42   # → 0.55
-                        fb = 0.7 - t2 * 0.7      # → 0.0
-                    elif age < 0.6:
-                        t2 = (age - 0.35) / 0.25
-                        fr = 1.0 - t2 * 0.15     # → 0.85
-                        fg = 0.55 - t2 * 0.35    # → 0.2
-                        fb = 0.0
-                    elif age < 0.85:
-                        t2 = (age - 0.6) / 0.25
-                        fr = 0.85 - t2 * 0.35    # → 0.5
-                        fg = 0.2 - t2 * 0.15     # → 0.05
-                        fb = 0.0
-                    else:
-                        t2 = (age - 0.85) / 0.15
-                        fr = 0.5 - t2 * 0.3
-                        fg = 0.05 - t2 * 0.05
-                        fb = 0.0
-
-                    # Size shrinks as flame rises, stretch makes it taller
-                    sz = p.size * (0.35 + 0.65 * (1.0 - age))
-                    stretch = 1.4 + 1.0 * (1.0 - age)
-                    fa = alpha * (1.0 - age ** 2)
-
-                    # Outer glow (large, very soft)
-                    cr.save()
-                    cr.translate(p.x, p.y)
-                    cr.scale(1.0, stretch)
-                    pat = cairo.RadialGradient(0, -sz * 0.15, 0,
-                                               0, 0, sz * 1.3)
-                    pat.add_color_stop_rgba(0.0, fr, fg, fb, fa * 0.35)
-                    pat.add_color_stop_rgba(0.6, fr * 0.8, fg * 0.4, 0, fa * 0.12)
-                    pat.add_color_stop_rgba(1.0, 0.2, 0, 0, 0)
-                    cr.set_source(pat)
-                    cr.arc(0, 0, sz * 1.3, 0, 2 * math.pi)
-                    cr.fill()
-                    cr.restore()
-
-                    # Core flame (bright center offset upward)
-                    cr.save()
-                    cr.translate(p.x, p.y)
-                    cr.scale(1.0, stretch)
-                    pat = cairo.RadialGradient(0, -sz * 0.25, sz * 0.08,
-                                               0, sz * 0.05, sz * 0.85)
-                    core_a = min(1.0, fa * 1.2)
-                    pat.add_color_stop_rgba(0.0, min(1, fr + 0.1),
-                                            min(1, fg + 0.1),
-                                            min(1, fb + 0.15), core_a)
-                    pat.add_color_stop_rgba(0.4, fr, fg * 0.6, 0, fa * 0.6)
-                    pat.add_color_stop_rgba(1.0, fr * 0.3, 0, 0, 0)
-                    cr.set_source(pat)
-                    cr.arc(0, 0, sz * 0.85, 0, 2 * math.pi)
-                    cr.fill()
-                    cr.restore()
-            elif ptype == 'fireflies':
-                # Glowing dot with halo
-                cr.arc(p.x, p.y, p.size * 2.5, 0, 2 * math.pi)
-                cr.set_source_rgba(r, g, b, alpha * 0.15)
+            if is_ember:
+                # ── Ember: tiny bright dot with short trail ──
+                fr, fg, fb = ember_rgb
+                cr.arc(px, py, sz, 0, 2 * math.pi)
+                cr.set_source_rgba(fr, fg, fb, fa)
                 cr.fill()
-                cr.arc(p.x, p.y, p.size, 0, 2 * math.pi)
-                cr.set_source_rgba(r, g, b, alpha)
+                # Glow halo
+                cr.arc(px, py, sz * 3, 0, 2 * math.pi)
+                cr.set_source_rgba(fr, fg * 0.5, 0, fa * 0.15)
                 cr.fill()
-            elif ptype == 'lightning':
-                segs = getattr(p, 'segments', None)
-                if segs and len(segs) > 1:
-                    # Bright bolt
-                    cr.set_line_width(p.size)
-                    cr.set_source_rgba(r, g, b, alpha)
-                    cr.move_to(segs[0][0], segs[0][1])
-                    for sx, sy in segs[1:]:
-                        cr.line_to(sx, sy)
-                    cr.stroke()
-                    # White-hot core
-                    cr.set_line_width(max(0.5, p.size * 0.4))
-                    cr.set_source_rgba(1, 1, 1, alpha * 0.7)
-                    cr.move_to(segs[0][0], segs[0][1])
-                    for sx, sy in segs[1:]:
-                        cr.line_to(sx, sy)
-                    cr.stroke()
-                    # Glow around bolt
-                    cr.set_line_width(p.size * 4)
-                    cr.set_source_rgba(r, g, b, alpha * 0.08)
-                    cr.move_to(segs[0][0], segs[0][1])
-                    for sx, sy in segs[1:]:
-                        cr.line_to(sx, sy)
-                    cr.stroke()
-            elif ptype == 'starfield':
-                # Streak that gets longer as it moves outward
-                dist = math.sqrt((p.x - w / 2) ** 2 + (p.y - h / 2) ** 2)
-                streak = min(dist * 0.06, 15)
-                a = getattr(p, 'angle', 0)
-                tail_x = p.x - math.cos(a) * streak
-                tail_y = p.y - math.sin(a) * streak
-                # Brightness increases with distance
-                bright = min(1.0, dist / (w * 0.3))
-                cr.move_to(tail_x, tail_y)
-                cr.line_to(p.x, p.y)
-                cr.set_source_rgba(r, g, b, alpha * bright)
-                cr.set_line_width(p.size)
-                cr.stroke()
-                # Bright dot at head
-                cr.arc(p.x, p.y, p.size * 0.6, 0, 2 * math.pi)
-                cr.set_source_rgba(1, 1, 1, alpha * bright * 0.8)
+            elif level:
+                # ── Flame body: soft teardrop with color ramp ──
+                glow, core = _get_flame_gradients(bucket, level)
+                cr.save()
+                cr.translate(px, py)
+                cr.scale(sz, sz * stretch)
+                cr.set_source(glow)
+                cr.arc(0, 0, 1.3, 0, 2 * math.pi)
                 cr.fill()
-            elif ptype == 'scanline':
-                # Horizontal bright line sweeping down
-                cr.rectangle(0, p.y, w, p.size)
-                cr.set_source_rgba(r, g, b, alpha * 0.4)
+                cr.set_source(core)
+                cr.arc(0, 0, 0.85, 0, 2 * math.pi)
                 cr.fill()
-                # Brighter center line
-                cr.rectangle(0, p.y + p.size * 0.3, w, p.size * 0.4)
-                cr.set_source_rgba(r, g, b, alpha)
-                cr.fill()
-            elif ptype == 'glitch':
-                # Random displaced rectangle
-                gw = getattr(p, 'vx', 50)
-                gh = getattr(p, 'vy', 6)
-                cr.rectangle(p.x, p.y, gw, gh)
-                # Shift color channels
-                seed = getattr(p, 'seed', 0.5)
-                if seed < 0.33:
-                    cr.set_source_rgba(r, 0, 0, alpha)
-                elif seed < 0.66:
-                    cr.set_source_rgba(0, g, 0, alpha)
-                else:
-                    cr.set_source_rgba(0, 0, b, alpha)
-                cr.fill()
-                # Offset duplicate
-                cr.rectangle(p.x + random.uniform(-5, 5),
-                             p.y + random.uniform(-2, 2), gw, gh)
-                cr.set_source_rgba(r, g, b, alpha * 0.3)
-                cr.fill()
-            else:  # snow, dust
-                cr.arc(p.x, p.y, p.size, 0, 2 * math.pi)
-                cr.set_source_rgba(r, g, b, alpha)
-                cr.fill()
-            cr.restore()
-
-        self._particles = alive
+                cr.restore()
+
+    def _draw_fireflies(self, cr, w, h, r, g, b, alphas):
+        # Glowing dot with halo
+        _fill_dots(cr, self.x, self.y, self.size * 2.5, alphas, r, g, b,
+                   alpha_scale=0.15)
+        _fill_dots(cr, self.x, self.y, self.size, alphas, r, g, b)
+
+    def _draw_lightning(self, cr, w, h, r, g, b, alphas):
+        for size, alpha, segs in zip(self.size.tolist(), alphas.tolist(),
+                                     self.segments):
+            if alpha < 0.01 or segs is None or len(segs) < 2:
+                continue
+            # Build the zigzag once; all three strokes reuse the path
+            (x0, y0), *rest = segs.tolist()
+            cr.move_to(x0, y0)
+            line_to = cr.line_to
+            for sx, sy in rest:
+                line_to(sx, sy)
+            # Bright bolt
+            cr.set_line_width(size)
+            cr.set_source_rgba(r, g, b, alpha)
+            cr.stroke_preserve()
+            # White-hot core
+            cr.set_line_width(max(0.5, size * 0.4))
+            cr.set_source_rgba(1, 1, 1, alpha * 0.7)
+            cr.stroke_preserve()
+            # Glow around bolt
+            cr.set_line_width(size * 4)
+            cr.set_source_rgba(r, g, b, alpha * 0.08)
+            cr.stroke()
+
+    def _draw_starfield(self, cr, w, h, r, g, b, alphas):
+        # Streak that gets longer as it moves outward
+        streak = np.minimum(self.dist * 0.06, 15)
+        # Brightness increases with distance
+        lit = alphas * np.minimum(1.0, self.dist / (w * 0.3))
+        lit[alphas < 0.01] = 0
+        _stroke_lines(cr, self.x - self.ux * streak,
+                      self.y - self.uy * streak,
+                      self.x, self.y, self.size, lit, r, g, b)
+        # Bright dot at head
+        _fill_dots(cr, self.x, self.y, self.size * 0.6, lit, 1, 1, 1,
+                   alpha_scale=0.8)
+
+    def _draw_scanline(self, cr, w, h, r, g, b, alphas):
+        # Horizontal bright line sweeping down, with a brighter center line
+        n = len(self)
+        widths = np.full(n, float(w))
+        _fill_rects(cr, np.zeros(n), self.y, widths, self.size, alphas,
+                    r, g, b, alpha_scale=0.4)
+        _fill_rects(cr, np.zeros(n), self.y + self.size * 0.3, widths,
+                    self.size * 0.4, alphas, r, g, b)
+
+    def _draw_glitch(self, cr, w, h, r, g, b, alphas):
+        # Random displaced rectangles (vx/vy hold each block's width and
+        # height), shifted into one color channel picked by seed
+        x, y, gw, gh, seed = self.x, self.y, self.vx, self.vy, self.seed
+        red = seed < 0.33
+        green = ~red & (seed < 0.66)
+        blue = seed >= 0.66
+        for mask, rr, gg, bb in ((red, r, 0, 0), (green, 0, g, 0),
+                                 (blue, 0, 0, b)):
+            if mask.any():
+                _fill_rects(cr, x[mask], y[mask], gw[mask], gh[mask],
+                            alphas[mask], rr, gg, bb)
+        # Offset duplicate
+        n = len(self)
+        _fill_rects(cr, x + self._rng.uniform(-5, 5, n),
+                    y + self._rng.uniform(-2, 2, n), gw, gh, alphas,
+                    r, g, b, alpha_scale=0.3)
+
+    _DRAWERS = {
+        'matrix_rain': _draw_matrix_rain, 'bubbles': _draw_bubbles,
+        'confetti': _draw_confetti, 'sparks': _draw_sparks,
+        'fire': _draw_fire, 'fireflies': _draw_fireflies,
+        'lightning': _draw_lightning, 'starfield': _draw_starfield,
+        'scanline': _draw_scanline, 'glitch': _draw_glitch,
+    }
 
 
 # Module-level singleton
@@ -597,10 +791,20 @@ _ambient_particles = AmbientParticleSystem()
 # ─── Data Flow Particle Manager ──────────────────────────────────────────────
 
 class DataFlowParticleManager:
-    """Manages dots traveling along connections."""
+    """Manages dots traveling along connections.
+
+    Each connection registers once and gets a row in one (n, _DOTS) array
+    of positions (0..1), so tick() advances every dot with one array op.
+    Rows are recycled when their connection is garbage collected.
+    """
+
+    _DOTS = 3
 
     def __init__(self):
-        self._particles = {}  # conn_id -> list of {t, speed}
+        self._rng = np.random.default_rng()
+        self._t = np.zeros((0, self._DOTS))
+        self._speed = np.zeros((0, self._DOTS))
+        self._free = []
         self._last_tick = 0
 
     def tick(self):
@@ -608,25 +812,30 @@ class DataFlowParticleManager:
         dt = min(now - self._last_tick, 0.1) if self._last_tick else 0.033
         self._last_tick = now
 
-        for cid in list(self._particles.keys()):
-            alive = []
-            for dot in self._particles[cid]:
-                dot['t'] += dot['speed'] * dt
-                if dot['t'] < 1.0:
-                    alive.append(dot)
-            self._particles[cid] = alive
+        t = self._t
+        t += self._speed * dt
+        t %= 1.0
 
-    def ensure_particles(self, conn_id):
-        """Ensure a connection has flowing particles."""
-        if conn_id not in self._particles:
-            self._particles[conn_id] = []
-        dots = self._particles[conn_id]
-        if len(dots) < 3:
-            dots.append({'t': 0.0, 'speed': random.uniform(0.3, 0.7)})
-
-    def get_particles(self, conn_id):
-        """Return list of t values (0..1) for dots on this connection."""
-        return [d['t'] for d in self._particles.get(conn_id, [])]
+    def register(self, connection):
+        """Give a connection a row of dots; returns the row index."""
+        if self._free:
+            idx = self._free.pop()
+        else:
+            idx = len(self._t)
+            grow = max(idx, 16)
+            self._t = np.concatenate((self._t, np.zeros((grow, self._DOTS))))
+            self._speed = np.concatenate(
+                (self._speed, np.zeros((grow, self._DOTS))))
+            self._free.extend(range(idx + grow - 1, idx, -1))
+        # Dots start spread along the wire instead of bunched at the source
+        self._t[idx] = self._rng.random(self._DOTS)
+        self._speed[idx] = self._rng.uniform(0.3, 0.7, self._DOTS)
+        weakref.finalize(connection, self._free.append, idx)
+        return idx
+
+    def get_particles(self, idx):
+        """Return list of t values (0..1) for dots on a registered row."""
+        return self._t[idx].tolist()
 
 
 _data_flow_particles = DataFlowParticleManager()
@@ -634,6 +843,31 @@ _data_flow_particles = DataFlowParticleManager()
 
 # ─── Block Entrance Tracker ──────────────────────────────────────────────────
 
+_frame_now = None
+
+
+def begin_frame():
+    """Stamp the time once per canvas redraw; see frame_time()."""
+    global _frame_now
+    _load()  # the per-frame flag globals are valid from here on
+    _frame_now = time.time()
+
+
+def end_frame():
+    """Close the frame opened by begin_frame(); frame_time() reads the clock again."""
+    global _frame_now
+    _frame_now = None
+
+
+def frame_time():
+    """Return the current frame's timestamp (or the time, outside a frame).
+
+    Everything drawn in one frame animates against the same instant, and
+    a canvas with many blocks costs one clock read per frame.
+    """
+    return _frame_now if _frame_now is not None else time.time()
+
+
 class BlockEntranceTracker:
     """Tracks block creation times to provide fade-in alpha."""
 
@@ -642,32 +876,41 @@ class BlockEntranceTracker:
     def __init__(self):
         self._birth = {}  # block_id -> time
         self._done = set()  # block_ids that already finished animating
+        self._expiry = []  # heap of (birth + _DURATION, block_id)
 
-    def register(self, block_id):
+    def register(self, block_id, now=None):
         """Call when a block is first created/placed."""
         if block_id not in self._birth and block_id not in self._done:
-            self._birth[block_id] = time.time()
+            if now is None:
+                now = frame_time()
+            self._birth[block_id] = now
+            heapq.heappush(self._expiry, (now + self._DURATION, block_id))
 
-    def get_alpha(self, block_id):
+    def get_alpha(self, block_id, now=None):
         """Return alpha 0..1 for fade-in. Returns 1.0 if not tracked or done."""
         birth = self._birth.get(block_id)
         if birth is None:
             return 1.0
-        elapsed = time.time() - birth
+        elapsed = (frame_time() if now is None else now) - birth
         if elapsed >= self._DURATION:
             del self._birth[block_id]
             self._done.add(block_id)
             return 1.0
         return elapsed / self._DURATION
 
-    def has_active(self):
+    def has_active(self, now=None):
         """True if any block is still animating."""
-        if not self._birth:
+        expiry = self._expiry
+        if not expiry:
             return False
-        now = time.time()
-        self._birth = {k: v for k, v in self._birth.items()
-                       if now - v < self._DURATION}
-        return bool(self._birth)
+        if now is None:
+            now = frame_time()
+        # Retire only the fades that ended since the last call
+        while expiry and expiry[0][0] <= now:
+            _, block_id = heapq.heappop(expiry)
+            self._birth.pop(block_id, None)
+            self._done.add(block_id)
+        return bool(expiry)
 
 
 _entrance_tracker = BlockEntranceTracker()
@@ -675,6 +918,7 @@ _entrance_tracker = BlockEntranceTracker()
 
 # ─── Toolbar CSS Generator ───────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=16)
 def generate_toolbar_css(bg, accent, text):
     """Generate CSS bytes for toolbar/menu theming.
 
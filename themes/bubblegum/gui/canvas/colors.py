@@ -7,16 +7,43 @@ SPDX-License-Identifier: GPL-2.0-or-later
 """
 
 
-from gi.repository import Gtk, Gdk, cairo
+from functools import lru_cache
+from itertools import chain
+
+import cairo
+from gi.repository import Gdk
 
 from .. import Constants
 
 
+# Channel byte -> float, so parsing is a hex decode plus lookups
+_B2F = tuple(v / 255.0 for v in range(256))
+
+
+@lru_cache(maxsize=None)
 def get_color(color_code):
+    # Plain '#RRGGBB' / '#RRGGBBAA' codes (every color in this file) are
+    # parsed directly; anything else (named colors, rgba()) still goes
+    # through Gdk.RGBA
+    if len(color_code) in (7, 9) and color_code[0] == '#':
+        try:
+            raw = bytes.fromhex(color_code[1:])
+        except ValueError:
+            raw = b''
+        # fromhex() skips spaces, so insist on one byte per digit pair
+        if len(raw) * 2 + 1 == len(color_code):
+            return (_B2F[raw[0]], _B2F[raw[1]], _B2F[raw[2]],
+                    _B2F[raw[3]] if len(raw) == 4 else 1.0)
     color = Gdk.RGBA()
     color.parse(color_code)
     return color.red, color.green, color.blue, color.alpha
 
+
+@lru_cache(maxsize=None)
+def get_pattern(rgba):
+    """Return a shared solid cairo pattern for an (r, g, b, a) tuple."""
+    return cairo.SolidPattern(*rgba)
+
 #################################################################################
 # Bubblegum — cotton candy pink & pastel fun
 #################################################################################
@@ -31,6 +58,8 @@ BORDER_COLOR = get_color('#E88FCF')     # Soft pink border
 BORDER_COLOR_DISABLED = get_color('#9E7A8E')
 
 FONT_COLOR = get_color('#FFE4F0')       # Pale pink-white text
+FONT_COLOR_ENABLED = FONT_COLOR[:3] + (1.0,)
+FONT_COLOR_DIMMED = FONT_COLOR[:3] + (0.60,)
 
 
 # Missing blocks
@@ -76,10 +105,10 @@ DEFAULT_DOMAIN_COLOR = get_color('#FF88CC')
 # port colors
 #################################################################################
 
-PORT_TYPE_TO_COLOR = {key: get_color(
-    color) for name, key, sizeof, color in Constants.CORE_TYPES}
-PORT_TYPE_TO_COLOR.update((key, get_color(color))
-                          for key, (_, color) in Constants.ALIAS_TYPES.items())
+PORT_TYPE_TO_COLOR = {key: get_color(color) for key, color in chain(
+    ((key, color) for name, key, sizeof, color in Constants.CORE_TYPES),
+    ((key, color) for key, (_, color) in Constants.ALIAS_TYPES.items()),
+)}
 
 
 #################################################################################
@@ -90,5 +119,5 @@ PORT_TYPE_TO_COLOR.update((key, get_color(color))
 AMBIENT_PARTICLE_TYPE = 'bubbles'
 AMBIENT_PARTICLE_COLOR = '#FF88CC'
 
-DARK_THEME_STYLES = ".type_color_complex { color: #E066CC; } .type_color_float { color: #FF88AA; } .type_color_int { color: #88CCFF; } .type_color_short { color: #AADDFF; } .type_color_byte { color: #FFAA88; } .type_color_complex_vector { color: #CC55BB; } .type_color_float_vector { color: #DD7799; } .type_color_int_vector { color: #77BBEE; } .type_color_short_vector { color: #99CCEE; } .type_color_byte_vector { color: #EE9977; } .type_color_id { color: #FFB5D5; } .type_color_stream_id { color: #FFB5D5; } .type_color_bus_connection { color: #CC88DD; } .type_color_wildcard { color: #BBBBBB; } .type_color_message { color: #FFDD88; } .type_color_msg { color: #FFDD88; } .type_color_bus { color: #CC88DD; }"
-LIGHT_THEME_STYLES = ".type_color_complex { color: #E066CC; } .type_color_float { color: #FF88AA; } .type_color_int { color: #88CCFF; } .type_color_short { color: #AADDFF; } .type_color_byte { color: #FFAA88; } .type_color_complex_vector { color: #CC55BB; } .type_color_float_vector { color: #DD7799; } .type_color_int_vector { color: #77BBEE; } .type_color_short_vector { color: #99CCEE; } .type_color_byte_vector { color: #EE9977; } .type_color_id { color: #FFB5D5; } .type_color_stream_id { color: #FFB5D5; } .type_color_bus_connection { color: #CC88DD; } .type_color_wildcard { color: #BBBBBB; } .type_color_message { color: #FFDD88; } .type_color_msg { color: #FFDD88; } .type_color_bus { color: #CC88DD; }"
+DARK_THEME_STYLES = b".type_color_complex { color: #E066CC; } .type_color_float { color: #FF88AA; } .type_color_int { color: #88CCFF; } .type_color_short { color: #AADDFF; } .type_color_byte { color: #FFAA88; } .type_color_complex_vector { color: #CC55BB; } .type_color_float_vector { color: #DD7799; } .type_color_int_vector { color: #77BBEE; } .type_color_short_vector { color: #99CCEE; } .type_color_byte_vector { color: #EE9977; } .type_color_id { color: #FFB5D5; } .type_color_stream_id { color: #FFB5D5; } .type_color_bus_connection { color: #CC88DD; } .type_color_wildcard { color: #BBBBBB; } .type_color_message { color: #FFDD88; } .type_color_msg { color: #FFDD88; } .type_color_bus { color: #CC88DD; }"
+LIGHT_THEME_STYLES = DARK_THEME_STYLES  # same styles for light GTK themes
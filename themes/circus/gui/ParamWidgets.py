@@ -7,6 +7,7 @@
 import os
 import configparser
 import subprocess
+from functools import lru_cache
 
 from gi.repository import Gtk, Gdk
 
@@ -20,17 +21,22 @@ def have_dark_theme():
     return True
 
 
+@lru_cache(maxsize=None)
+def get_css_provider(dark_theme):
+    """Return the parsed style provider for the given mode (built once)."""
+    style_provider = Gtk.CssProvider()
+    style_provider.load_from_data(
+        DARK_THEME_STYLES if dark_theme else LIGHT_THEME_STYLES)
+    return style_provider
+
+
 def add_style_provider():
     """
     Load GTK styles
     """
-    style_provider = Gtk.CssProvider()
-    dark_theme = have_dark_theme()
-    style_provider.load_from_data(
-        DARK_THEME_STYLES if dark_theme else LIGHT_THEME_STYLES)
     Gtk.StyleContext.add_provider_for_screen(
         Gdk.Screen.get_default(),
-        style_provider,
+        get_css_provider(have_dark_theme()),
         Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
     )
 
@@ -32,7 +32,23 @@ LOG_LEVELS = {
 
 from gi.repository import Gdk
 
-css = b"""
+# Effects config (read directly — no gui package import at module level)
+import json as _json
+from pathlib import Path as _Path
+
+_fx_path = _Path.home() / ".gnuradio" / "grc_effects.json"
+try:
+    _fx = _json.loads(_fx_path.read_bytes())
+except (OSError, ValueError):
+    _fx = {}  # missing or unreadable: defaults, like effects._load()
+if not isinstance(_fx, dict):
+    _fx = {}
+_selection_on = _fx.get('selection_css', True)
+_toolbar_on = _fx.get('toolbar_css', True)
+
+css = b""
+if _selection_on:
+    css += b"""
 /* Cursor */
 entry, textview {
     caret-color: #000000;
@@ -59,28 +75,9 @@ textview:focus text selection {
 }
 """
 
-
-
-provider = Gtk.CssProvider()
-provider.load_from_data(css)
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(),
-    provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_USER
-)
-
-# Toolbar CSS theming (reads config directly — no gui package import at module level)
-try:
-    import json as _json
-    from pathlib import Path as _Path
-    _fx_path = _Path.home() / ".gnuradio" / "grc_effects.json"
-    _toolbar_on = True  # default
-    if _fx_path.is_file():
-        with open(_fx_path) as _f:
-            _fx = _json.load(_f)
-        _toolbar_on = _fx.get('toolbar_css', True)
-    if _toolbar_on:
-        _toolbar_css = b"""
+# Toolbar CSS theming
+if _toolbar_on:
+    _toolbar_css = b"""
 headerbar, .titlebar {
     background-color: #1A1A0A; color: #FFEEAA;
     border-bottom: 1px solid #FFDD00;
@@ -101,13 +98,17 @@ toolbar, .toolbar {
 toolbar button { color: #FFEEAA; background: transparent; }
 toolbar button:hover { background-color: #FFDD00; }
 """
-        _tp = Gtk.CssProvider()
-        _tp.load_from_data(_toolbar_css)
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(), _tp,
-            Gtk.STYLE_PROVIDER_PRIORITY_USER)
-except Exception:
-    pass
+    css += _toolbar_css
+
+# One provider for everything: a single CSS parse and style invalidation
+if css:
+    provider = Gtk.CssProvider()
+    provider.load_from_data(css)
+    Gtk.StyleContext.add_provider_for_screen(
+        Gdk.Screen.get_default(),
+        provider,
+        Gtk.STYLE_PROVIDER_PRIORITY_USER
+    )
 
 
 def main():
@@ -7,17 +7,43 @@ SPDX-License-Identifier: GPL-2.0-or-later
 """
 
 
-from gi.repository import Gtk, Gdk, cairo
-# import pycairo
+from functools import lru_cache
+from itertools import chain
+
+import cairo
+from gi.repository import Gdk
 
 from .. import Constants
 
 
+# Channel byte -> float, so parsing is a hex decode plus lookups
+_B2F = tuple(v / 255.0 for v in range(256))
+
+
+@lru_cache(maxsize=None)
 def get_color(color_code):
+    # Plain '#RRGGBB' / '#RRGGBBAA' codes (every color in this file) are
+    # parsed directly; anything else (named colors, rgba()) still goes
+    # through Gdk.RGBA
+    if len(color_code) in (7, 9) and color_code[0] == '#':
+        try:
+            raw = bytes.fromhex(color_code[1:])
+        except ValueError:
+            raw = b''
+        # fromhex() skips spaces, so insist on one byte per digit pair
+        if len(raw) * 2 + 1 == len(color_code):
+            return (_B2F[raw[0]], _B2F[raw[1]], _B2F[raw[2]],
+                    _B2F[raw[3]] if len(raw) == 4 else 1.0)
     color = Gdk.RGBA()
     color.parse(color_code)
     return color.red, color.green, color.blue, color.alpha
 
+
+@lru_cache(maxsize=None)
+def get_pattern(rgba):
+    """Return a shared solid cairo pattern for an (r, g, b, a) tuple."""
+    return cairo.SolidPattern(*rgba)
+
 #################################################################################
 # fg colors — Cyberpunk Red theme
 #################################################################################
@@ -32,6 +58,8 @@ BORDER_COLOR = get_color('#660000')     # Dark red border
 BORDER_COLOR_DISABLED = get_color('#704040')
 
 FONT_COLOR = get_color('#FF4444')       # Red text
+FONT_COLOR_ENABLED = FONT_COLOR[:3] + (1.0,)
+FONT_COLOR_DIMMED = FONT_COLOR[:3] + (0.60,)
 
 
 # Missing blocks
@@ -78,10 +106,10 @@ DEFAULT_DOMAIN_COLOR = get_color('#FFB300')
 # port colors
 #################################################################################
 
-PORT_TYPE_TO_COLOR = {key: get_color(
-    color) for name, key, sizeof, color in Constants.CORE_TYPES}
-PORT_TYPE_TO_COLOR.update((key, get_color(color))
-                          for key, (_, color) in Constants.ALIAS_TYPES.items())
+PORT_TYPE_TO_COLOR = {key: get_color(color) for key, color in chain(
+    ((key, color) for name, key, sizeof, color in Constants.CORE_TYPES),
+    ((key, color) for key, (_, color) in Constants.ALIAS_TYPES.items()),
+)}
 
 
 #################################################################################
@@ -93,42 +121,23 @@ AMBIENT_PARTICLE_TYPE = 'sparks'
 AMBIENT_PARTICLE_COLOR = '#FF4400'
 
 DARK_THEME_STYLES = b"""
-                         #dtype_complex         { background-color: #CC2222; }
-                         #dtype_real            { background-color: #FF6644; }
-                         #dtype_float           { background-color: #FF6644; }
-                         #dtype_int             { background-color: #FFB300; }
-
-                         #dtype_complex_vector  { background-color: #AA1818; }
-                         #dtype_real_vector     { background-color: #CC4433; }
-                         #dtype_float_vector    { background-color: #CC4433; }
-                         #dtype_int_vector      { background-color: #CC8800; }
-
-                         #dtype_bool            { background-color: #FFB300; }
-                         #dtype_hex             { background-color: #FFB300; }
-                         #dtype_string          { background-color: #FF4444; }
-                         #dtype_id              { background-color: #FF6644; }
-                         #dtype_stream_id       { background-color: #FF6644; }
-                         #dtype_raw             { background-color: #FF6644; }
-
-                         #enum_custom           { background-color: #CC2222; }
-                     """
-LIGHT_THEME_STYLES = b"""
-                        #dtype_complex         { background-color: #CC2222; }
-                        #dtype_real            { background-color: #FF6644; }
-                        #dtype_float           { background-color: #FF6644; }
-                        #dtype_int             { background-color: #FFB300; }
-
-                        #dtype_complex_vector  { background-color: #AA1818; }
-                        #dtype_real_vector     { background-color: #CC4433; }
-                        #dtype_float_vector    { background-color: #CC4433; }
-                        #dtype_int_vector      { background-color: #CC8800; }
-
-                        #dtype_bool            { background-color: #FFB300; }
-                        #dtype_hex             { background-color: #FFB300; }
-                        #dtype_string          { background-color: #FF4444; }
-                        #dtype_id              { background-color: #FF6644; }
-                        #dtype_stream_id       { background-color: #FF6644; }
-                        #dtype_raw             { background-color: #FF6644; }
-
-                        #enum_custom           { background-color: #CC2222; }
-                    """
+#dtype_complex         { background-color: #CC2222; }
+#dtype_real            { background-color: #FF6644; }
+#dtype_float           { background-color: #FF6644; }
+#dtype_int             { background-color: #FFB300; }
+
+#dtype_complex_vector  { background-color: #AA1818; }
+#dtype_real_vector     { background-color: #CC4433; }
+#dtype_float_vector    { background-color: #CC4433; }
+#dtype_int_vector      { background-color: #CC8800; }
+
+#dtype_bool            { background-color: #FFB300; }
+#dtype_hex             { background-color: #FFB300; }
+#dtype_string          { background-color: #FF4444; }
+#dtype_id              { background-color: #FF6644; }
+#dtype_stream_id       { background-color: #FF6644; }
+#dtype_raw             { background-color: #FF6644; }
+
+#enum_custom           { background-color: #CC2222; }
+"""
+LIGHT_THEME_STYLES = DARK_THEME_STYLES  # same styles for light GTK themes
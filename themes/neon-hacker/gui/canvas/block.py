@@ -9,6 +9,8 @@ SPDX-License-Identifier: GPL-2.0-or-later
 import cairo
 import math
 import time
+from collections import OrderedDict
+from functools import lru_cache
 
 from gi.repository import Gtk, Pango, PangoCairo
 
@@ -24,9 +26,82 @@ from ...core import utils
 from ...core.blocks import Block as CoreBlock
 
 
+# Click-ripple rings reach 50px past the block; plus their stroke and port glow
+_CULL_MARGIN = 60
+
+
+def _ripple_frames(steps):
+    """Visible rings for each step of the 1 s click ripple."""
+    frames = []
+    for i in range(steps):
+        t = i / steps
+        rings = []
+        for ring in range(3):
+            delay = ring * 0.12
+            rt = t - delay
+            if rt < 0:
+                continue
+            rt = min(rt / (1.0 - delay), 1.0)
+            expand = rt * 50
+            alpha = (1.0 - rt) * 0.45
+            if alpha > 0.01:
+                # (expand, alpha, line width, corner radius)
+                rings.append((expand, alpha, 2.5 - rt * 1.5, 10.0 + expand * 0.3))
+        frames.append(tuple(rings))
+    return tuple(frames)
+
+
+_RIPPLE_FPS = 60
+_RIPPLE_FRAMES = _ripple_frames(_RIPPLE_FPS)
+
+# Room around the body for the halo (8px) and the border stroke
+_CHROME_PAD = 12
+# Above this the chrome is drawn directly instead of cached (about 1 MB)
+_CHROME_MAX_PIXELS = 1 << 18
+# Total size of all cached chrome rasters, shared by every block
+_CHROME_CACHE_BYTES = 24 << 20
+# Chrome is drawn directly until the zoom has held still this long (s)
+_CHROME_SETTLE = 0.3
+
+_TITLE_TMPL = '<span font_desc="%s"><b>%s</b></span>'
+_TITLE_TMPL_INVALID = '<span foreground="red" font_desc="%s"><b>%s</b></span>'
+
+# Title text color per block state (anything else is disabled)
+_TITLE_COLORS = {
+    'enabled': (1.0, 1.0, 1.0, 1.0),
+    'bypassed': (1.0, 0.7, 0.28, 1.0),
+}
+_TITLE_COLOR_DISABLED = colors.FONT_COLOR_DIMMED
+
+# Pango.SCALE is a power of two, so multiplying by this is exact
+_INV_PANGO_SCALE = 1.0 / Pango.SCALE
+
+
+@lru_cache(maxsize=None)
+def _layout_widget():
+    """Widget that hands out Pango layouts (each gets its own context)."""
+    return Gtk.DrawingArea()
+
+
 class Block(CoreBlock, Drawable):
     """The graphical signal block."""
 
+    # Recently built outline paths, keyed by geometry (see _rounded_path)
+    _PATH_CACHE_SIZE = 512
+    _path_cache = OrderedDict()
+
+    # Chrome rasters keyed by everything that shows in them (see _paint_chrome)
+    _chrome_cache = OrderedDict()
+    _chrome_cache_bytes = 0
+    # Device scale of the last chrome paint and when it last changed
+    _chrome_scale = None
+    _chrome_scale_time = 0.0
+
+    # Last stored coordinate and its scaled form (see the coordinate getter).
+    # Class-level so they exist before Drawable.__init__ sets the position.
+    _scaled_from = None
+    _scaled_coordinate = (0, 0)
+
     def __init__(self, parent, **n):
         """
         Block constructor.
@@ -43,13 +118,19 @@ class Block(CoreBlock, Drawable):
             None,  # params
         ]
         self._surface_layouts_offsets = 0, 0
+        self._surface_layouts_key = None  # markup the layouts were built from
+        self._surface_layouts_sizes = None
         self._comment_layout = None
 
         self._area = []
+        self._cull_pad = _CULL_MARGIN  # widened by the ports in create_shapes
         self._click_time = 0
-        self._entrance_registered = False
+        self._entrance_pending = True
         self._border_color = self._bg_color = colors.BLOCK_ENABLED_COLOR
-        self._font_color = list(colors.FONT_COLOR)
+        self._gradient_key = self._gradient = None
+        self._font_color = colors.FONT_COLOR_ENABLED
+        self._title_color = _TITLE_COLORS['enabled']
+        self._horizontal = True  # set from the rotation in create_shapes
 
     @property
     def coordinate(self):
@@ -59,7 +140,12 @@ class Block(CoreBlock, Drawable):
         Returns:
             the coordinate tuple (x, y) or (0, 0) if failure
         """
-        return Utils.scale(self.states['coordinate'])
+        coor = self.states['coordinate']
+        if coor is not self._scaled_from:
+            # DPI_SCALING is fixed at startup, so the stored tuple is the key
+            self._scaled_from = coor
+            self._scaled_coordinate = Utils.scale(coor)
+        return self._scaled_coordinate
 
     @coordinate.setter
     def coordinate(self, coor):
@@ -127,16 +213,22 @@ class Block(CoreBlock, Drawable):
             return colors.BORDER_COLOR_DISABLED
 
         self._bg_color = get_bg()
-        self._font_color[-1] = 1.0 if self.state == 'enabled' else 0.60
+        self._font_color = (colors.FONT_COLOR_ENABLED if self.state == 'enabled'
+                            else colors.FONT_COLOR_DIMMED)
+        self._title_color = _TITLE_COLORS.get(self.state, _TITLE_COLOR_DISABLED)
         self._border_color = get_border()
 
     def create_shapes(self):
         """Update the block, parameters, and ports when a change occurs."""
-        if self.is_horizontal():
+        # Rotation only changes through a flowgraph update, which lands here
+        self._horizontal = self.is_horizontal()
+        if self._horizontal:
             self._area = (0, 0, self.width, self.height)
-        elif self.is_vertical():
+        else:
             self._area = (0, 0, self.height, self.width)
         self.bounds_from_area(self._area)
+        self._cull_pad = _CULL_MARGIN + max(
+            (port.width for port in self.active_ports()), default=0)
 
         bussified = self.current_bus_structure['source'], self.current_bus_structure['sink']
         for ports, has_busses in zip((self.active_sources, self.active_sinks), bussified):
@@ -148,36 +240,23 @@ class Block(CoreBlock, Drawable):
                       port_separation - ports[0].height) / 2
             for port in ports:
                 port.create_shapes()
-                port.coordinate = {
-                    0: (+self.width, offset),
-                    90: (offset, -port.width),
-                    180: (-port.width, offset),
-                    270: (offset, +self.width),
-                }[port.connector_direction]
+                direction = port.connector_direction
+                if direction == 0:
+                    port.coordinate = (+self.width, offset)
+                elif direction == 90:
+                    port.coordinate = (offset, -port.width)
+                elif direction == 180:
+                    port.coordinate = (-port.width, offset)
+                else:  # 270
+                    port.coordinate = (offset, +self.width)
 
                 offset += Constants.PORT_SEPARATION if not has_busses else port.height + \
                     Constants.PORT_SPACING
 
     def create_labels(self, cr=None):
         """Create the labels for the signal block."""
-
-        title_layout, params_layout = self._surface_layouts = [
-            Gtk.DrawingArea().create_pango_layout(''),
-            Gtk.DrawingArea().create_pango_layout(''),
-        ]
-
-        if cr:
-            PangoCairo.update_layout(cr, title_layout)
-            PangoCairo.update_layout(cr, params_layout)
-
-        title_layout.set_markup(
-            '<span {foreground} font_desc="{font}"><b>{label}</b></span>'.format(
-                foreground='foreground="red"' if not self.is_valid() else '',
-                font=Constants.BLOCK_FONT,
-                label=Utils.encode(self.label)
-            )
-        )
-        title_width, title_height = title_layout.get_size()
+        tmpl = _TITLE_TMPL if self.is_valid() else _TITLE_TMPL_INVALID
+        title_markup = tmpl % (Constants.BLOCK_FONT, Utils.encode(self.label))
 
         force_show_id = Actions.TOGGLE_SHOW_BLOCK_IDS.get_active()
 
@@ -190,14 +269,41 @@ class Block(CoreBlock, Drawable):
             markups = ['<span font_desc="{font}"><b>key: </b>{key}</span>'.format(
                 font=Constants.PARAM_FONT, key=self.key)]
 
-        params_layout.set_spacing(Constants.LABEL_SEPARATION * Pango.SCALE)
-        params_layout.set_markup('\n'.join(markups))
-        params_width, params_height = params_layout.get_size() if markups else (0, 0)
+        params_markup = '\n'.join(markups)
+
+        # Parsing and shaping the markup is the expensive part; reuse the
+        # layouts while the text is unchanged. Calls with a cairo context
+        # (zoom) always rebuild, since the metrics depend on it.
+        key = (title_markup, params_markup) if cr is None else None
+        if key is not None and key == self._surface_layouts_key:
+            title_layout, params_layout = self._surface_layouts
+            title_width, title_height, params_width, params_height = \
+                self._surface_layouts_sizes
+        else:
+            title_layout, params_layout = self._surface_layouts = [
+                _layout_widget().create_pango_layout(''),
+                _layout_widget().create_pango_layout(''),
+            ]
+
+            if cr:
+                PangoCairo.update_layout(cr, title_layout)
+                PangoCairo.update_layout(cr, params_layout)
+
+            title_layout.set_markup(title_markup)
+            title_width, title_height = title_layout.get_size()
 
-        label_width = max(title_width, params_width) / Pango.SCALE
-        label_height = title_height / Pango.SCALE
+            params_layout.set_spacing(Constants.LABEL_SEPARATION * Pango.SCALE)
+            params_layout.set_markup(params_markup)
+            params_width, params_height = params_layout.get_size() if markups else (0, 0)
+
+            self._surface_layouts_key = key
+            self._surface_layouts_sizes = (title_width, title_height,
+                                           params_width, params_height)
+
+        label_width = max(title_width, params_width) * _INV_PANGO_SCALE
+        label_height = title_height * _INV_PANGO_SCALE
         if markups:
-            label_height += Constants.LABEL_SEPARATION + params_height / Pango.SCALE
+            label_height += Constants.LABEL_SEPARATION + params_height * _INV_PANGO_SCALE
 
         width = label_width + 2 * Constants.BLOCK_LABEL_PADDING
         height = label_height + 2 * Constants.BLOCK_LABEL_PADDING
@@ -227,7 +333,7 @@ class Block(CoreBlock, Drawable):
         self._surface_layouts_offsets = [
             (0, (height - label_height) / 2.0),
             (0, (height - label_height) / 2.0 +
-             Constants.LABEL_SEPARATION + title_height / Pango.SCALE)
+             Constants.LABEL_SEPARATION + title_height * _INV_PANGO_SCALE)
         ]
 
         title_layout.set_width(width * Pango.SCALE)
@@ -270,7 +376,7 @@ class Block(CoreBlock, Drawable):
             )
 
         if markups:
-            layout = self._comment_layout = Gtk.DrawingArea().create_pango_layout('')
+            layout = self._comment_layout = _layout_widget().create_pango_layout('')
             layout.set_markup(''.join(markups))
         else:
             self._comment_layout = None
@@ -284,38 +390,31 @@ class Block(CoreBlock, Drawable):
         cr.arc(x + radius,         y + radius,          radius, math.pi,      3 * math.pi / 2)
         cr.close_path()
 
-    def draw(self, cr):
-        """
-        Draw the signal block with label and inputs/outputs.
-        """
-        border_color = colors.HIGHLIGHT_COLOR if self.highlighted else self._border_color
-        cr.translate(*self.coordinate)
-
-        for port in self.active_ports():
-            cr.save()
-            port.draw(cr)
-            cr.restore()
-
-        x, y, width, height = self._area
-
-        # Block entrance animation
-        _entrance_alpha = 1.0
-        if effects and effects.is_enabled('block_entrance_anim'):
-            if not self._entrance_registered:
-                self._entrance_registered = True
-                effects._entrance_tracker.register(id(self))
-            _entrance_alpha = effects._entrance_tracker.get_alpha(id(self))
-            if _entrance_alpha < 1.0:
-                cr.push_group()
+    def _rounded_path(self, cr, x, y, width, height, radius=10.0):
+        """Start a new path holding a _rounded_rect(), reusing a cached copy."""
+        # Coordinates are block-local, so blocks of the same size share one
+        key = (x, y, width, height, radius)
+        path = self._path_cache.get(key)
+        cr.new_path()
+        if path is None:
+            self._rounded_rect(cr, x, y, width, height, radius)
+            self._path_cache[key] = cr.copy_path()
+            if len(self._path_cache) > self._PATH_CACHE_SIZE:
+                self._path_cache.popitem(last=False)
+        else:
+            self._path_cache.move_to_end(key)
+            cr.append_path(path)
 
+    def _draw_chrome(self, cr, x, y, width, height, border_color, shadows):
+        """Draw the halo, drop shadow, body and border."""
         # Glow halo when highlighted
         if self.highlighted:
             try:
                 cr.save()
-                self._rounded_rect(cr, x - 8, y - 8, width + 16, height + 16)
+                self._rounded_path(cr, x - 8, y - 8, width + 16, height + 16)
                 cr.set_source_rgba(0.0, 1.0, 1.0, 0.25)
                 cr.fill()
-                self._rounded_rect(cr, x - 4, y - 4, width + 8, height + 8)
+                self._rounded_path(cr, x - 4, y - 4, width + 8, height + 8)
                 cr.set_source_rgba(0.0, 1.0, 1.0, 0.45)
                 cr.fill()
                 cr.restore()
@@ -323,81 +422,155 @@ class Block(CoreBlock, Drawable):
                 cr.restore()
 
         # Drop shadow
-        if effects and effects.is_enabled('drop_shadows'):
+        if shadows:
             try:
                 cr.save()
                 for i, off in enumerate([6, 4, 2]):
                     alpha = 0.08 + i * 0.04
-                    self._rounded_rect(cr, x + off, y + off, width, height)
+                    self._rounded_path(cr, x + off, y + off, width, height)
                     cr.set_source_rgba(0, 0, 0, alpha)
                     cr.fill()
                 cr.restore()
             except Exception:
                 cr.restore()
 
-        # Gradient fill
-        self._rounded_rect(cr, x, y, width, height)
-        try:
+        # Gradient fill, rebuilt only when the color or size changes
+        self._rounded_path(cr, x, y, width, height)
+        gradient_key = (self._bg_color, y, height)
+        if gradient_key != self._gradient_key:
             r1, g1, b1 = self._bg_color[0], self._bg_color[1], self._bg_color[2]
             grad = cairo.LinearGradient(x, y, x, y + height)
             grad.add_color_stop_rgba(0.0, min(r1 + 0.10, 1), min(g1 + 0.10, 1), min(b1 + 0.14, 1), 1.0)
             grad.add_color_stop_rgba(1.0, max(r1 - 0.06, 0), max(g1 - 0.06, 0), max(b1 - 0.05, 0), 1.0)
-            cr.set_source(grad)
-        except Exception:
-            cr.set_source_rgba(*self._bg_color)
+            self._gradient_key, self._gradient = gradient_key, grad
+        cr.set_source(self._gradient)
         cr.fill_preserve()
-        cr.set_source_rgba(*border_color)
+        cr.set_source(colors.get_pattern(border_color))
         cr.stroke()
 
+    def _paint_chrome(self, cr, x, y, width, height, border_color):
+        """
+        Paint the block chrome from a shared raster cache. Blocks that look
+        the same at the same device scale share one raster, and the cache
+        evicts least recently used rasters past a fixed byte budget. Blits
+        land on a whole device pixel so edges stay sharp.
+        """
+        shadows = bool(effects and effects.is_enabled('drop_shadows'))
+        device_scale = cr.get_target().get_device_scale()[0]
+        scale = cr.get_matrix().xx * device_scale
+        now = effects.frame_time() if effects else time.time()
+        if scale != Block._chrome_scale:
+            Block._chrome_scale, Block._chrome_scale_time = scale, now
+        line_width = cr.get_line_width()
+        surf_w = int(math.ceil((width + 2 * _CHROME_PAD) * scale))
+        surf_h = int(math.ceil((height + 2 * _CHROME_PAD) * scale))
+        if (surf_w * surf_h > _CHROME_MAX_PIXELS or
+                now - Block._chrome_scale_time < _CHROME_SETTLE):
+            # Deep zoom on a big block, or the zoom is still moving and a
+            # raster made now would be thrown away on the next step
+            self._draw_chrome(cr, x, y, width, height, border_color, shadows)
+            return
+
+        key = (x, y, width, height, scale, line_width, self._bg_color,
+               self.state, border_color, self.highlighted, shadows)
+        cache = self._chrome_cache
+        surface = cache.get(key)
+        if surface is None:
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, surf_w, surf_h)
+            ctx = cairo.Context(surface)
+            ctx.scale(scale, scale)
+            ctx.translate(_CHROME_PAD - x, _CHROME_PAD - y)
+            ctx.set_line_width(line_width)
+            self._draw_chrome(ctx, x, y, width, height, border_color, shadows)
+            cache[key] = surface
+            Block._chrome_cache_bytes += surface.get_stride() * surf_h
+            while Block._chrome_cache_bytes > _CHROME_CACHE_BYTES and len(cache) > 1:
+                _, old = cache.popitem(last=False)
+                Block._chrome_cache_bytes -= old.get_stride() * old.get_height()
+        else:
+            cache.move_to_end(key)
+
+        # Snap the raster's corner onto the device pixel grid
+        dev_x, dev_y = cr.user_to_device(x - _CHROME_PAD, y - _CHROME_PAD)
+        snap_x = (round(dev_x * device_scale) - dev_x * device_scale) / device_scale
+        snap_y = (round(dev_y * device_scale) - dev_y * device_scale) / device_scale
+        off_x, off_y = cr.device_to_user_distance(snap_x, snap_y)
+
+        cr.save()
+        cr.translate(x - _CHROME_PAD + off_x, y - _CHROME_PAD + off_y)
+        cr.scale(1 / scale, 1 / scale)
+        cr.set_source_surface(surface, 0, 0)
+        cr.paint()
+        cr.restore()
+
+    def draw(self, cr):
+        """
+        Draw the signal block with label and inputs/outputs.
+        """
+        # Skip blocks that are entirely outside the area being repainted,
+        # padded by how far ports and decorations reach past the body.
+        # Tested in canvas coordinates, before any transform or port work.
+        x, y, width, height = self._area
+        pad = self._cull_pad
+        block_x, block_y = self.coordinate
+        clip_x0, clip_y0, clip_x1, clip_y1 = cr.clip_extents()
+        if (block_x + x + width + pad < clip_x0 or block_x + x - pad > clip_x1 or
+                block_y + y + height + pad < clip_y0 or block_y + y - pad > clip_y1):
+            return
+        cr.translate(block_x, block_y)
+        border_color = colors.HIGHLIGHT_COLOR if self.highlighted else self._border_color
+
+        for port in self.active_ports():
+            cr.save()
+            port.draw(cr)
+            cr.restore()
+
+        # Block entrance animation
+        _entrance_alpha = 1.0
+        if self._entrance_pending:
+            if effects and effects.is_enabled('block_entrance_anim'):
+                # register() is a no-op once the block is tracked
+                effects._entrance_tracker.register(id(self))
+                _entrance_alpha = effects._entrance_tracker.get_alpha(id(self))
+            if _entrance_alpha < 1.0:
+                cr.push_group()
+            else:
+                # Faded in (or the effect is off): skip this from now on
+                self._entrance_pending = False
+
+        self._paint_chrome(cr, x, y, width, height, border_color)
 
         # --- Click ripple animation (square pulse outward) ---
         if not effects or effects.is_enabled('click_ripple'):
-            now = time.time()
-            if self.highlighted and self._click_time == 0:
-                self._click_time = now
-            elif not self.highlighted:
+            if not self.highlighted:
                 self._click_time = 0
-
-            if self._click_time > 0:
-                elapsed = now - self._click_time
-                duration = 1.0  # seconds
-                if elapsed < duration:
-                    t = elapsed / duration  # 0..1
+            else:
+                now = effects.frame_time() if effects else time.time()
+                if self._click_time == 0:
+                    self._click_time = now
+                step = int((now - self._click_time) * _RIPPLE_FPS)
+                if 0 <= step < len(_RIPPLE_FRAMES):
                     hl = colors.HIGHLIGHT_COLOR
-                    for ring in range(3):
-                        delay = ring * 0.12
-                        rt = t - delay
-                        if rt < 0:
-                            continue
-                        rt = min(rt / (1.0 - delay), 1.0)
-                        expand = rt * 50
-                        alpha = (1.0 - rt) * 0.45
-                        if alpha > 0.01:
-                            cr.save()
-                            cr.set_source_rgba(hl[0], hl[1], hl[2], alpha)
-                            cr.set_line_width(2.5 - rt * 1.5)
-                            self._rounded_rect(cr,
-                                x - expand, y - expand,
-                                width + expand * 2, height + expand * 2,
-                                radius=10.0 + expand * 0.3)
-                            cr.stroke()
-                            cr.restore()
+                    cr.save()
+                    for expand, alpha, line_width, radius in _RIPPLE_FRAMES[step]:
+                        cr.set_source_rgba(hl[0], hl[1], hl[2], alpha)
+                        cr.set_line_width(line_width)
+                        self._rounded_path(cr,
+                            x - expand, y - expand,
+                            width + expand * 2, height + expand * 2,
+                            radius=radius)
+                        cr.stroke()
+                    cr.restore()
         # Complete entrance animation
         if _entrance_alpha < 1.0:
             cr.pop_group_to_source()
             cr.paint_with_alpha(_entrance_alpha)
 
-        if self.is_vertical():
+        if not self._horizontal:
             cr.rotate(-math.pi / 2)
             cr.translate(-self.width, 0)
 
-        # Per-state title color
-        if self.state == 'enabled':
-            cr.set_source_rgba(1.0, 1.0, 1.0, 1.0)
-        elif self.state == 'bypassed':
-            cr.set_source_rgba(1.0, 0.7, 0.28, 1.0)
-        else:
-            cr.set_source_rgba(*self._font_color)
+        cr.set_source_rgba(*self._title_color)
         for layout, offset in zip(self._surface_layouts, self._surface_layouts_offsets):
             cr.save()
             cr.translate(*offset)
@@ -421,7 +594,7 @@ class Block(CoreBlock, Drawable):
             return
         x, y = self.coordinate
 
-        if self.is_horizontal():
+        if self._horizontal:
             y += self.height + Constants.BLOCK_LABEL_PADDING
         else:
             x += self.height + Constants.BLOCK_LABEL_PADDING
@@ -433,23 +606,21 @@ class Block(CoreBlock, Drawable):
         cr.restore()
 
     def get_extents(self):
-        extent = Drawable.get_extents(self)
+        x0, y0, x1, y1 = Drawable.get_extents(self)
         x, y = self.coordinate
         for port in self.active_ports():
-            extent = (min_or_max(xy, offset + p_xy)
-                      for offset, min_or_max, xy, p_xy in zip(
-                          (x, y, x, y),
-                          (min, min, max, max),
-                          extent,
-                          port.get_extents()
-                      ))
-        return tuple(extent)
+            px0, py0, px1, py1 = port.get_extents()
+            x0 = min(x0, x + px0)
+            y0 = min(y0, y + py0)
+            x1 = max(x1, x + px1)
+            y1 = max(y1, y + py1)
+        return x0, y0, x1, y1
 
     def get_extents_comment(self):
         x, y = self.coordinate
         if not self._comment_layout:
             return x, y, x, y
-        if self.is_horizontal():
+        if self._horizontal:
             y += self.height + Constants.BLOCK_LABEL_PADDING
         else:
             x += self.height + Constants.BLOCK_LABEL_PADDING
@@ -6,7 +6,8 @@ SPDX-License-Identifier: GPL-2.0-or-later
 """
 
 from argparse import Namespace
-from math import pi
+from collections import OrderedDict
+from math import cos, pi, sin
 import time
 
 from . import colors
@@ -29,6 +30,23 @@ from ...core.Connection import Connection as CoreConnection
 from ...core.utils.descriptors import nop_write
 
 
+# Bezier control arms reach 35px past the bounding points; plus glow width
+_CULL_MARGIN = 50
+
+
+def _stroke_glow(cr, color, line_width):
+    """Wide translucent pass under the wire; keeps the current path."""
+    cr.set_source_rgba(color[0], color[1], color[2], 0.22)
+    cr.set_line_width(line_width * 3.2)
+    cr.stroke_preserve()
+    cr.set_line_width(line_width)
+
+
+def _get_domain_color(platform, domain_id):
+    domain = platform.domains.get(domain_id, None)
+    return colors.get_color(domain.color) if domain else colors.DEFAULT_DOMAIN_COLOR
+
+
 class Connection(CoreConnection, Drawable):
     """
     A graphical connection for ports.
@@ -47,6 +65,10 @@ class Connection(CoreConnection, Drawable):
     _NEON_ERROR = (1.00, 0.15, 0.15, 1.0)     # red
     # -----------------------------------
 
+    # Recently built wire paths, keyed by shape (see _make_path)
+    _PATH_CACHE_SIZE = 256
+    _path_cache = OrderedDict()
+
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         Drawable.__init__(self)
@@ -58,9 +80,15 @@ class Connection(CoreConnection, Drawable):
         self._current_port_rotations = self._current_coordinates = None
 
         self._rel_points = None  # connection coordinates relative to sink/source
-        self._arrow_rotation = 0.0  # rotation of the arrow in radians
+        self._arrow_poly = ()  # arrow head vertices relative to its tip
         self._current_cr = None  # for what_is_selected() of curved line
         self._line_path = None
+        self._state_key = self._resolved_colors = None
+        self._gradient_key = self._gradient = None
+        self._gradient_ok = False  # both ends have a color to blend
+        self._sink_offset = (0, 0)  # sink connector relative to source
+        self._source_coord = (0, 0)  # source connector as of the last _make_path
+        self._flow_idx = None  # row in effects._data_flow_particles
 
     @nop_write
     @property
@@ -95,10 +123,6 @@ class Connection(CoreConnection, Drawable):
         ]
         self._current_coordinates = None  # triggers _make_path()
 
-        def get_domain_color(domain_id):
-            domain = self.parent_platform.domains.get(domain_id, None)
-            return colors.get_color(domain.color) if domain else colors.DEFAULT_DOMAIN_COLOR
-
         if source.domain == GR_MESSAGE_DOMAIN:
             self._line_width_factor = 1.0
             self._color1 = None
@@ -106,10 +130,20 @@ class Connection(CoreConnection, Drawable):
         else:
             if source.domain != sink.domain:
                 self._line_width_factor = 2.0
-            self._color1 = get_domain_color(source.domain)
-            self._color2 = get_domain_color(sink.domain)
-
-        self._arrow_rotation = -sink.rotation / 180 * pi
+            platform = self.parent_platform
+            self._color1 = _get_domain_color(platform, source.domain)
+            self._color2 = _get_domain_color(platform, sink.domain)
+        self._gradient_ok = bool(self._color1 and self._color2)
+
+        # Arrow head rotated once here instead of through the cairo matrix
+        angle = -sink.rotation / 180 * pi
+        c, s = cos(angle), sin(angle)
+        half_base = CONNECTOR_ARROW_BASE / 2
+        self._arrow_poly = (
+            (CONNECTOR_ARROW_HEIGHT * c, CONNECTOR_ARROW_HEIGHT * s),
+            (half_base * s, -half_base * c),
+            (-half_base * s, half_base * c),
+        )
 
         if not self._bounding_points:
             self._make_path()  # no cr set --> only sets bounding_points for extent
@@ -119,6 +153,8 @@ class Connection(CoreConnection, Drawable):
         x_end, y_end = self.sink_port.connector_coordinate_absolute
 
         x_e, y_e = x_end - x_pos, y_end - y_pos
+        self._source_coord = x_pos, y_pos
+        self._sink_offset = x_e, y_e
 
         p0 = 0, 0
         p1, p2, (dx_e1, dy_e1), (dx_e2, dy_e2), (dx_e3, dy_e3) = self._rel_points
@@ -128,11 +164,23 @@ class Connection(CoreConnection, Drawable):
         self._bounding_points = p0, p1, p4, p5  # ignores curved part =(
 
         if cr:
-            cr.move_to(*p0)
-            cr.line_to(*p1)
-            cr.curve_to(*(p2 + p3 + p4))
-            cr.line_to(*p5)
-            self._line_path = cr.copy_path()
+            # The path is relative to the source connector, so connections
+            # with the same shape share one copy (e.g. while a block is
+            # dragged back and forth)
+            key = (x_e, y_e, self.source_port.rotation, self.sink_port.rotation)
+            path = self._path_cache.get(key)
+            if path is None:
+                cr.move_to(*p0)
+                cr.line_to(*p1)
+                cr.curve_to(*(p2 + p3 + p4))
+                cr.line_to(*p5)
+                path = cr.copy_path()
+                self._path_cache[key] = path
+                if len(self._path_cache) > self._PATH_CACHE_SIZE:
+                    self._path_cache.popitem(last=False)
+            else:
+                self._path_cache.move_to_end(key)
+            self._line_path = path
 
     @staticmethod
     def _is_too_dark(c):
@@ -142,24 +190,8 @@ class Connection(CoreConnection, Drawable):
         r, g, b, a = c
         return (r + g + b) < 0.35 or a < 0.2
 
-    def draw(self, cr):
-        """
-        Draw the connection.
-        """
-        self._current_cr = cr
-        sink = self.sink_port
-        source = self.source_port
-
-        port_rotations = (source.rotation, sink.rotation)
-        if self._current_port_rotations != port_rotations:
-            self.create_shapes()
-            self._current_port_rotations = port_rotations
-
-        new_coordinates = (source.parent_block.coordinate, sink.parent_block.coordinate)
-        if self._current_coordinates != new_coordinates:
-            self._make_path(cr)
-            self._current_coordinates = new_coordinates
-
+    def _resolve_colors(self, valid):
+        """Return the (wire, arrow) colors for the current state."""
         # Apply the standard state logic first (highlight/disabled/error)
         def apply_state(base_color):
             if base_color is None:
@@ -168,7 +200,7 @@ class Connection(CoreConnection, Drawable):
                 return self._NEON_HIGHLIGHT
             if not self.enabled:
                 return self._NEON_DISABLED
-            if not self.is_valid():
+            if not valid:
                 return self._NEON_ERROR
             return base_color
 
@@ -177,9 +209,9 @@ class Connection(CoreConnection, Drawable):
 
         # Force hacker-vibe colors for enabled+valid+not-highlighted
         # so it NEVER ends up black even if domain colors are dark.
-        if self.enabled and self.is_valid() and not self.highlighted:
+        if self.enabled and valid and not self.highlighted:
             # Message connection: only color2 exists
-            if source.domain == GR_MESSAGE_DOMAIN:
+            if self.source_port.domain == GR_MESSAGE_DOMAIN:
                 color2 = self._NEON_ARROW
             else:
                 # Stream connection: wire uses color1, arrow uses color2
@@ -187,52 +219,85 @@ class Connection(CoreConnection, Drawable):
                     color1 = self._NEON_WIRE
                 if self._is_too_dark(color2):
                     color2 = self._NEON_ARROW
+        return color1, color2
+
+    def draw(self, cr):
+        """
+        Draw the connection.
+        """
+        self._current_cr = cr
+        sink = self.sink_port
+        source = self.source_port
+
+        port_rotations = (source.rotation, sink.rotation)
+        if self._current_port_rotations != port_rotations:
+            self.create_shapes()
+            self._current_port_rotations = port_rotations
+
+        new_coordinates = (source.parent_block.coordinate, sink.parent_block.coordinate)
+        if self._current_coordinates != new_coordinates:
+            self._make_path(cr)
+            self._current_coordinates = new_coordinates
 
-        cr.translate(*self.coordinate)
-        cr.set_line_width(self._line_width_factor * cr.get_line_width())
+        # Skip painting wires that are entirely off-screen. The bounding
+        # points leave out the curve, so pad by how far it can bulge.
+        clip_x0, clip_y0, clip_x1, clip_y1 = cr.clip_extents()
+        x_pos, y_pos = self._source_coord
+        xs = [x for x, _ in self._bounding_points]
+        ys = [y for _, y in self._bounding_points]
+        if (x_pos + max(xs) + _CULL_MARGIN < clip_x0 or
+                x_pos + min(xs) - _CULL_MARGIN > clip_x1 or
+                y_pos + max(ys) + _CULL_MARGIN < clip_y0 or
+                y_pos + min(ys) - _CULL_MARGIN > clip_y1):
+            return
+
+        # State colors only change with the state flags or base colors
+        valid = self.is_valid()
+        state_key = (self.highlighted, self.enabled, valid,
+                     self._color1, self._color2)
+        if state_key != self._state_key:
+            self._state_key = state_key
+            color1, color2 = self._resolve_colors(valid)
+            self._resolved_colors = color1, color2, color1 != color2
+        color1, color2, colors_differ = self._resolved_colors
+
+        cr.translate(x_pos, y_pos)
+        line_width = self._line_width_factor * cr.get_line_width()
+        cr.set_line_width(line_width)
         cr.new_path()
         cr.append_path(self._line_path)
 
         arrow_pos = cr.get_current_point()
 
-        # Glow pass makes it readable on dark backgrounds
-        def glow(c):
-            if not c:
-                return
-            r, g, b, a = c
-            cr.save()
-            cr.set_source_rgba(r, g, b, 0.22)
-            cr.set_line_width(cr.get_line_width() * 3.2)
-            cr.stroke_preserve()
-            cr.restore()
-
         # Connection gradient effect
-        _use_gradient = (effects and effects.is_enabled('connection_gradient') and
-                         color1 and color2 and color1 != color2 and
-                         self.enabled and self.is_valid() and not self.highlighted)
+        _use_gradient = (self._gradient_ok and
+                         effects and effects.CONNECTION_GRADIENT and
+                         colors_differ and
+                         self.enabled and valid and not self.highlighted)
 
+        # Glow pass makes it readable on dark backgrounds. It only touches
+        # the source and line width, so no save/restore around it.
         if color1:  # not a message connection
-            glow(color1)
+            _stroke_glow(cr, color1, line_width)
             if _use_gradient:
-                try:
-                    x1, y1 = 0, 0
-                    x2 = self.sink_port.connector_coordinate_absolute[0] - self.coordinate[0]
-                    y2 = self.sink_port.connector_coordinate_absolute[1] - self.coordinate[1]
-                    grad = _cairo.LinearGradient(x1, y1, x2, y2)
+                x2, y2 = self._sink_offset
+                # Reuse the pattern until the wire or its colors change
+                gradient_key = (x2, y2, color1, color2)
+                if gradient_key != self._gradient_key:
+                    grad = _cairo.LinearGradient(0, 0, x2, y2)
                     grad.add_color_stop_rgba(0, *color1)
                     grad.add_color_stop_rgba(1, *color2)
-                    cr.set_source(grad)
-                except Exception:
-                    cr.set_source_rgba(*color1)
+                    self._gradient_key, self._gradient = gradient_key, grad
+                cr.set_source(self._gradient)
             else:
-                cr.set_source_rgba(*color1)
+                cr.set_source(colors.get_pattern(color1))
             cr.stroke_preserve()
 
-        if color1 != color2 and not _use_gradient:
+        if colors_differ and not _use_gradient:
             cr.save()
             cr.set_dash([5.0, 5.0], 5.0 if color1 else 0.0)
-            glow(color2)
-            cr.set_source_rgba(*color2)
+            _stroke_glow(cr, color2, line_width)
+            cr.set_source(colors.get_pattern(color2))
             cr.stroke()
             cr.restore()
         else:
@@ -240,12 +305,12 @@ class Connection(CoreConnection, Drawable):
 
         # Arrow head
         cr.save()
-        cr.move_to(*arrow_pos)
-        cr.set_source_rgba(*color2)
-        cr.rotate(self._arrow_rotation)
-        cr.rel_move_to(CONNECTOR_ARROW_HEIGHT, 0)
-        cr.rel_line_to(-CONNECTOR_ARROW_HEIGHT, -CONNECTOR_ARROW_BASE / 2)
-        cr.rel_line_to(0, CONNECTOR_ARROW_BASE)
+        ax, ay = arrow_pos
+        (x0, y0), (x1, y1), (x2, y2) = self._arrow_poly
+        cr.set_source(colors.get_pattern(color2))
+        cr.move_to(ax + x0, ay + y0)
+        cr.line_to(ax + x1, ay + y1)
+        cr.line_to(ax + x2, ay + y2)
         cr.close_path()
         cr.fill()
         cr.restore()
@@ -256,7 +321,9 @@ class Connection(CoreConnection, Drawable):
                 cr.save()
                 cr.new_path()
                 cr.append_path(self._line_path)
-                offset = (time.time() * 60) % 24.0
+                # One clock read per frame, shared by all highlighted wires
+                now = effects.frame_time() if effects else time.time()
+                offset = (now * 60) % 24.0
                 cr.set_dash([8.0, 8.0], offset)
                 cr.set_line_width(3.0)
                 cr.set_source_rgba(1.0, 1.0, 1.0, 0.85)
@@ -266,13 +333,12 @@ class Connection(CoreConnection, Drawable):
                 cr.restore()
 
         # Data flow particles
-        if (effects and effects.is_enabled('data_flow_particles') and
-                self.enabled and self.is_valid() and self._line_path):
+        if (effects and effects.DATA_FLOW_PARTICLES and
+                self.enabled and valid and self._line_path):
             try:
-                conn_id = id(self)
-                effects._data_flow_particles.ensure_particles(conn_id)
-                effects._data_flow_particles.tick()
-                for t in effects._data_flow_particles.get_particles(conn_id):
+                if self._flow_idx is None:
+                    self._flow_idx = effects._data_flow_particles.register(self)
+                for t in effects._data_flow_particles.get_particles(self._flow_idx):
                     if 0 < t < 1:
                         cr.save()
                         cr.new_path()
@@ -280,8 +346,7 @@ class Connection(CoreConnection, Drawable):
                         # Walk the path to find position at parameter t
                         # Approximate: use source/sink coordinates
                         x1, y1 = 0, 0
-                        x2 = self.sink_port.connector_coordinate_absolute[0] - self.coordinate[0]
-                        y2 = self.sink_port.connector_coordinate_absolute[1] - self.coordinate[1]
+                        x2, y2 = self._sink_offset
                         px = x1 + (x2 - x1) * t
                         py = y1 + (y2 - y1) * t
                         cr.new_path()
@@ -301,10 +366,12 @@ class Connection(CoreConnection, Drawable):
         if coor_m:
             return Drawable.what_is_selected(self, coor, coor_m)
 
-        x, y = [a - b for a, b in zip(coor, self.coordinate)]
         cr = self._current_cr
         if cr is None:
             return
+        # Hit-test against the wire as last drawn
+        x_pos, y_pos = self._source_coord
+        x, y = coor[0] - x_pos, coor[1] - y_pos
 
         cr.save()
         cr.new_path()
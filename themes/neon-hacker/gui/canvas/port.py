@@ -9,6 +9,7 @@ SPDX-License-Identifier: GPL-2.0-or-later
 
 import math
 import time
+from functools import lru_cache
 
 from gi.repository import Gtk, PangoCairo, Pango
 
@@ -25,6 +26,12 @@ except ImportError:
 from ...core.ports import Port as CorePort
 
 
+@lru_cache(maxsize=None)
+def _layout_widget():
+    """Widget that hands out Pango layouts (each gets its own context)."""
+    return Gtk.DrawingArea()
+
+
 class Port(CorePort, Drawable):
     """The graphical port."""
 
@@ -109,7 +116,7 @@ class Port(CorePort, Drawable):
 
     def create_labels(self, cr=None):
         """Create the labels for the socket."""
-        self.label_layout = Gtk.DrawingArea().create_pango_layout('')
+        self.label_layout = _layout_widget().create_pango_layout('')
         self.label_layout.set_alignment(Pango.Alignment.CENTER)
 
         if cr:
@@ -169,9 +176,9 @@ class Port(CorePort, Drawable):
                 pass
 
         cr.rectangle(*self._area)
-        cr.set_source_rgba(*self._bg_color)
+        cr.set_source(colors.get_pattern(self._bg_color))
         cr.fill_preserve()
-        cr.set_source_rgba(*border_color)
+        cr.set_source(colors.get_pattern(border_color))
         cr.stroke()
 
         if not self._show_label: